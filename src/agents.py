@@ -0,0 +1,500 @@
+### ---------- EXPLANATION ------------- ###
+# The agents playing the game. Each algorithm is
+# a class configured at creation, which is given
+# the game it plays with set_game; the game calls
+# choose_next_move with its state at every tick.
+# make_agent creates an agent from the name of an
+# algorithm, as used by snakeAI.py and main.py.
+
+from gameModule import RIGHT, DOWN, LEFT, UP, NEW_CHAR, S_CHAR, CLOSED_CHAR
+from hamiltonian import get_cycle
+from collections import deque
+from array import array
+import heapq
+import numpy as np
+
+ALGORITHMS = ['random', 'sshaped', 'astar', 'weighted', 'inverse']
+A_STAR_MODES = {'astar': 'default', 'weighted': 'weighted', 'inverse': 'inverse'}
+MOVES = [RIGHT, DOWN, LEFT, UP]
+MOVE_INDICES = {RIGHT: 0, DOWN: 1, LEFT: 2, UP: 3} # index of each move in MOVES
+
+
+class Node:
+    __slots__ = ('position', 'parent', 'g', 'h', 'f')
+
+    def __init__(self, position, parent):
+        self.position = position
+        self.parent = parent
+
+        self.g = 0
+        self.h = 0
+        self.f = self.g + self.h
+
+    def __repr__(self):
+        return f'({self.position[0]}, {self.position[1]})'
+
+    def __lt__(self, other):
+        return self.f < other.f
+
+
+class Path:
+    """
+        Path followed by the snake, stored as the indices of its moves (see MOVE_INDICES) in an array of bytes.
+        The moves are stored from the last one to the first one, so that pop() gives the next move in O(1).
+    """
+    __slots__ = ('moves',)
+
+    def __init__(self, moves=()):
+        self.moves = array('b', moves)
+
+    @classmethod
+    def to_node(cls, node):
+        """
+            Path from the root of the search to the given node, following the parents.
+        """
+        path = cls()
+        while node.parent is not None:
+            move = (node.position[0] - node.parent.position[0], node.position[1] - node.parent.position[1])
+            path.moves.append(MOVE_INDICES[move])
+            node = node.parent
+        return path
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __repr__(self):
+        return f'Path({list(reversed(self.moves))})'
+
+    def pop(self):
+        return self.moves.pop()
+
+    def cells(self, start):
+        """
+            The cells of the path, from the first one after start to the last one.
+        """
+        position = start
+        for index in reversed(self.moves):
+            move = MOVES[index]
+            position = (position[0] + move[0], position[1] + move[1])
+            yield position
+
+
+class FoodRegion:
+    """
+        Incremental answer to "is there a path from the head to the food?", used on every move of the survival mode.
+        Instead of a new A* at each tick, the set of free cells connected to the food is kept from one tick to the
+        next. While the snake is in survival mode, the head can only move into cells outside of this region (else
+        the food would have been reachable), so the only change to the region is the cell freed by the tail, which
+        may connect new cells to it. Any other change (new food, the snake did not simply move one step) rebuilds
+        the region from scratch.
+    """
+    def __init__(self):
+        self.food = None
+        self.cells = set()
+        self.head = None
+        self.tail = None
+        self.length = 0
+
+    def neighbours(self, grid, position):
+        for move in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+            neighbour = (position[0] + move[0], position[1] + move[1])
+            if 0 <= neighbour[0] < grid.rows and 0 <= neighbour[1] < grid.columns:
+                yield neighbour
+
+    def grow(self, grid, start):
+        # Flood fill from start through the free cells that are not in the region yet
+        self.cells.add(start)
+        stack = [start]
+        while stack:
+            for neighbour in self.neighbours(grid, stack.pop()):
+                if neighbour not in self.cells and not grid.is_blocked(neighbour[0], neighbour[1]):
+                    self.cells.add(neighbour)
+                    stack.append(neighbour)
+
+    def is_reachable(self, state, food):
+        grid, score, alive, snake = state
+        head = snake[0]
+        moved_one_step = len(snake) == self.length and len(snake) > 1 and snake[1] == self.head
+        if food != self.food or not moved_one_step or head in self.cells:
+            self.food = food
+            self.cells = set()
+            self.grow(grid, food)
+        elif not grid.is_blocked(self.tail[0], self.tail[1]) and self.tail not in self.cells:
+            if any(neighbour in self.cells for neighbour in self.neighbours(grid, self.tail)):
+                self.grow(grid, self.tail)
+
+        self.head = head
+        self.tail = snake[-1]
+        self.length = len(snake)
+        return any(neighbour in self.cells for neighbour in self.neighbours(grid, head))
+
+
+class Agent:
+    """
+        Base class of the agents. The game played is given at creation or with set_game.
+    """
+    timed_methods = ('choose_next_move',) # The methods timed by instrument (see profiling.TIMERS)
+
+    def __init__(self, game=None):
+        self.game = game
+        self.moves = MOVES
+        self.profiler = None
+
+    def set_game(self, game):
+        self.game = game
+
+    def instrument(self, profiler):
+        """
+            Records the latency of the timed methods and the search counters of this agent in the profiler. The
+            methods are wrapped on the instance only, the agents that are not instrumented are not slowed down.
+        :param profiler: The profiling.Profiler
+        """
+        self.profiler = profiler
+        for name in self.timed_methods:
+            setattr(self, name, profiler.timed(name, getattr(self, name)))
+
+    def choose_next_move(self, state):
+        """
+            This function is called by the game instance in order to find the next move chosen by the agent.
+        :param state: The state containing the grid, the snake body, the score and a boolean indicating if the snake
+                      is alive
+        :return: The move chosen by the algorithm
+        """
+        raise NotImplementedError
+
+
+class RandomAgent(Agent):
+    """
+        Random play: a random move is drawn at each iteration.
+    """
+    def __init__(self, game=None, seed=171):
+        super(RandomAgent, self).__init__(game)
+        self.rng = np.random.default_rng(seed)
+
+    def choose_next_move(self, state):
+        return self.moves[self.rng.integers(4)]
+
+
+class SShapedAgent(Agent):
+    """
+        S-Shaped algorithm: the snake follows a Hamiltonian cycle of the grid during all the game and it gives the
+        perfect score. The cycle is built once per grid layout and cached, so a move is a simple lookup.
+    """
+    def __init__(self, game=None, shortcuts=False):
+        """
+        :param shortcuts: Take safe shortcuts along the cycle towards the food
+        """
+        super(SShapedAgent, self).__init__(game)
+        self.shortcuts = shortcuts
+
+    def choose_next_move(self, state):
+        grid, score, alive, snake = state
+        cycle = get_cycle(grid.rows, grid.columns, self.game.walls)
+        if cycle is None:
+            print("No Hamiltonian cycle found for this grid")
+            return self.moves[1]
+        if self.shortcuts:
+            return cycle.shortcut_move(grid, snake, self.game.food)
+        return cycle.next_move(snake[0])
+
+
+class AStarAgent(Agent):
+    """
+        A* algorithm and its variants (see astar for the modes), with an optional survival mode used when no path to
+        the food is found.
+    """
+    timed_methods = ('choose_next_move', 'astar', 'survival_mode')
+
+    def __init__(self, game=None, mode='default', survival=False, interactive=False):
+        """
+        :param mode: default = classic A*, weighted = weighted A*, inverse = reverse A*
+        :param survival: Use the survival mode when A* does not find any path to the food
+        :param interactive: Display the execution of the A* algorithm (see SnakeGame.show_search)
+        """
+        super(AStarAgent, self).__init__(game)
+        self.mode = mode
+        self.survival = survival
+        self.interactive = interactive
+        self.best_path = None # The path used by the snake
+        self.is_in_survival_mode = False
+        self.food_region = FoodRegion() # Reachability of the food, reused between the moves of the survival mode
+
+    def choose_next_move(self, state):
+        grid, score, alive, snake = state
+
+        # self.survival is the boolean that indicates if the user wanted the algorithm to use the survival mode
+        # self.is_in_survival_mode indicates if the algorithm is in survival mode at the current move
+        if self.survival:
+            # check if the snake can find a path to the apple and then end survival mode
+            if self.is_in_survival_mode and self.best_path and self.food_region.is_reachable(state, self.game.food):
+                self.best_path = []
+                print("End Survival mode")
+                self.is_in_survival_mode = False
+
+        # When self.best_path is empty, that means we need to generate a path with A*.
+        # We also need to end the survival mode if the snake was previously in this mode
+        if not self.best_path:
+            if self.survival:
+                if self.is_in_survival_mode:
+                    print("End Full Survival mode")
+                    self.is_in_survival_mode = False
+            if self.profiler is not None:
+                self.profiler.count('replans')
+            self.best_path = self.astar(state, self.game.food, mode=self.mode, interactive=self.interactive)
+
+        # When A* does not find any path to his goal, our implementation returns 171. In that case, we need to
+        # enter in survival mode (if specified by the user).
+        if self.best_path == 171:
+            if self.survival:
+                print('Start Survival mode')
+                self.is_in_survival_mode = True
+                if self.profiler is not None:
+                    self.profiler.count('survival replans')
+                self.best_path = self.survival_mode(state)
+                if self.best_path == 171:
+                    print("Survival mode did not work")
+                    return self.moves[1]
+            else:
+                # if the user does not specify to use the survival mode, the snake goes DOWN when A* does not work
+                print("A* did not find path")
+                return self.moves[1]
+
+        return self.get_next_move(self.best_path)
+
+    def get_next_move(self, path):
+        """
+            This function gives the next move of the path.
+        :param path: The path followed by the snake
+        :return: The next move
+        """
+        return self.moves[path.pop()]
+
+    def h_cost(self, current, end):
+        """
+            Cost used in the A* algorithm
+        :param current: current node
+        :param end: end node
+        :return: the Manhattan distance between the current node and the end node
+        """
+        res = abs(current.position[0] - end.position[0]) + abs(
+            current.position[1] - end.position[1])
+        return res
+
+    def dist_to_snake_field(self, snake, rows, columns):
+        """
+            This function computes, for every cell of the grid, the minimum Manhattan distance to the snake body.
+            It is a multi-source BFS from all the body cells that ignores the obstacles, which gives exactly the
+            Manhattan distance to the closest segment, computed once instead of once per A* child.
+        :param snake: snake body
+        :param rows: number of rows of the grid
+        :param columns: number of columns of the grid
+        :return: flat list of the distances, the distance of the cell (i, j) is at index i * columns + j
+        """
+        field = [-1] * (rows * columns)
+        queue = deque()
+        for i, j in snake:
+            if field[i * columns + j] == -1:
+                field[i * columns + j] = 0
+                queue.append((i, j))
+        while queue:
+            i, j = queue.popleft()
+            dist = field[i * columns + j] + 1
+            for new_i, new_j in ((i, j - 1), (i, j + 1), (i - 1, j), (i + 1, j)):
+                if 0 <= new_i < rows and 0 <= new_j < columns and field[new_i * columns + new_j] == -1:
+                    field[new_i * columns + new_j] = dist
+                    queue.append((new_i, new_j))
+        return field
+
+    def astar(self, state, goal_pos, mode='default', interactive=False):
+        """
+            This function is an implementation of the A* algorithm
+        :param state: The current state of the game
+        :param goal_pos: The position where the snake has to go
+        :param mode: default = classic A*, weighted = weighted A*, inverse = reverse A* (the survival mode has its own
+                     search, see survival_mode)
+        :param interactive: Record the execution of the A* algorithm and give it to the game to display (see
+                            SnakeGame.show_search), the grid is not modified
+        :return: The path to the goal
+        """
+        grid, score, alive, snake = state
+        head = snake[0]
+        # closed_set holds the positions already expanded and best_g the g value of the positions on the open list,
+        # so that checking if a child was already seen is O(1). A position is pushed at most once: the first parent
+        # found is kept, which gives the same paths as the previous list based implementation.
+        closed_set = set()
+        best_g = {}
+        open_list = []
+        head_node = Node(head, None)
+        food_node = Node(goal_pos, None)
+        trace = [] # (char, position) of the expanded (CLOSED_CHAR) and generated (S_CHAR) nodes, then of the path
+
+        heapq.heappush(open_list, head_node)
+        best_g[head] = head_node.g
+        profiler = self.profiler
+        open_list_peak = 0
+
+        while open_list:
+            if profiler is not None and len(open_list) > open_list_peak:
+                open_list_peak = len(open_list)
+            current_node = heapq.heappop(open_list)
+            del best_g[current_node.position]
+            closed_set.add(current_node.position)
+
+            if interactive:
+                trace.append((CLOSED_CHAR, current_node.position))
+
+            if current_node.position == food_node.position:
+                path = Path.to_node(current_node)
+
+                if interactive:
+                    trace.extend((NEW_CHAR, position) for position in path.cells(head))
+                    self.game.show_search(trace)
+
+                if profiler is not None:
+                    self.count_search(closed_set, open_list_peak)
+                return path
+
+            for new_position in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+                node_position = (
+                    current_node.position[0] + new_position[0], current_node.position[1] + new_position[1])
+
+                # Make sure within range
+                if node_position[0] > (grid.rows - 1) or node_position[0] < 0 or node_position[1] > (
+                        grid.columns - 1) or node_position[1] < 0:
+                    continue
+
+                # Make sure walkable terrain
+                if grid.is_blocked(node_position[0], node_position[1]):
+                    continue
+
+                # Child is on the closed list or already on the open list
+                if node_position in closed_set or node_position in best_g:
+                    continue
+
+                child = Node(node_position, current_node)
+
+                # Create the f, g, and h values
+                if mode == 'default':
+                    child.g = current_node.g + 1
+                    child.h = self.h_cost(child, food_node)
+                    child.f = child.g + child.h
+
+                elif mode == 'weighted':
+                    child.g = current_node.g + 1
+                    child.h = 10 * (self.h_cost(child, food_node))
+                    child.f = child.g + child.h
+
+                elif mode == 'inverse':
+                    child.g = current_node.g + 1
+                    child.h = self.h_cost(child, food_node)
+                    child.f =  10000 - (child.g + child.h)
+
+                # Add the child to the open list
+                heapq.heappush(open_list, child)
+                best_g[node_position] = child.g
+
+                if interactive:
+                    trace.append((S_CHAR, node_position))
+
+        if profiler is not None:
+            self.count_search(closed_set, open_list_peak)
+        if interactive:
+            self.game.show_search(trace)
+
+        return 171
+
+    def count_search(self, closed_set, open_list_peak):
+        self.profiler.count('nodes expanded', len(closed_set))
+        self.profiler.peak('open list peak', open_list_peak)
+
+    def survival_mode(self, state):
+        """
+            This function is a Survival mode implementation. The snake tries to find the longest path from his head
+            to his tail, the targets being the nodes of his tail from the last one to the 6th one. Instead of one A*
+            per target, a single search with the survival f-score explores the whole reachable area once and records
+            the first path found to each target; the longest one is kept (the closest target to the end of the tail
+            in case of a tie). The grid is not modified.
+        :param state: The current state of the game
+        :return: The longest path to his tail. The function may return 171 which indicate that no path has been found.
+                 This case is managed at a higher level.
+        """
+        grid, score, alive, snake = state
+        head = snake[0]
+        targets = set(snake[index] for index in range(len(snake) - 1, 5, -1))
+        if not targets:
+            return 171
+
+        dist_field = self.dist_to_snake_field(snake, grid.rows, grid.columns)
+        tail_node = Node(snake[-1], None)
+        reached = {} # target position -> node from which it was first reached
+        closed_set = set()
+        best_g = {}
+        open_list = []
+        heapq.heappush(open_list, Node(head, None))
+        best_g[head] = 0
+        profiler = self.profiler
+        open_list_peak = 0
+
+        while open_list:
+            if profiler is not None and len(open_list) > open_list_peak:
+                open_list_peak = len(open_list)
+            current_node = heapq.heappop(open_list)
+            del best_g[current_node.position]
+            closed_set.add(current_node.position)
+
+            for new_position in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+                node_position = (
+                    current_node.position[0] + new_position[0], current_node.position[1] + new_position[1])
+
+                if node_position in targets:
+                    if node_position not in reached:
+                        reached[node_position] = current_node
+                    continue
+
+                if not (0 <= node_position[0] < grid.rows and 0 <= node_position[1] < grid.columns):
+                    continue
+                if grid.is_blocked(node_position[0], node_position[1]):
+                    continue
+                if node_position in closed_set or node_position in best_g:
+                    continue
+
+                child = Node(node_position, current_node)
+                child.g = current_node.g + 1
+                child.h = self.h_cost(child, tail_node)
+                child.f = - (child.g + 5 * child.h) + 2 * dist_field[node_position[0] * grid.columns + node_position[1]]
+                heapq.heappush(open_list, child)
+                best_g[node_position] = child.g
+        if profiler is not None:
+            self.count_search(closed_set, open_list_peak)
+
+        best_target = None
+        for index in range(len(snake) - 1, 5, -1):
+            parent = reached.get(snake[index])
+            # the length of the path to a target is the g of the node it was reached from, plus one
+            if parent is not None and parent.g + 1 >= 3 and (best_target is None or parent.g > reached[best_target].g):
+                best_target = snake[index]
+
+        if best_target is None:
+            return 171
+
+        return Path.to_node(Node(best_target, reached[best_target]))
+
+
+def make_agent(algorithm, game=None, survival=False, interactive=False, shortcuts=False, seed=171):
+    """
+        Creates the agent of an algorithm.
+    :param algorithm: One of ALGORITHMS
+    :param game: The game played by the agent, can also be given later with set_game
+    :param survival: Survival mode of the A* algorithms
+    :param interactive: Display the execution of the A* algorithms
+    :param shortcuts: Shortcuts of the S-Shaped algorithm
+    :param seed: Seed of the random algorithm
+    :return: The agent
+    """
+    if algorithm == 'random':
+        return RandomAgent(game, seed=seed)
+    if algorithm == 'sshaped':
+        return SShapedAgent(game, shortcuts=shortcuts)
+    if algorithm in A_STAR_MODES:
+        return AStarAgent(game, mode=A_STAR_MODES[algorithm], survival=survival, interactive=interactive)
+    raise ValueError("Unknown algorithm: %s" % algorithm)
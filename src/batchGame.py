@@ -0,0 +1,194 @@
+### ---------- EXPLANATION ------------- ###
+# Headless simulator running N snake games in
+# lock-step. All the boards are stacked in one
+# numpy array and a single call to step() moves
+# every snake, with vectorized collisions, food
+# eating and tail removal. The rules are the ones
+# of SnakeGame.move_snake.
+
+import numpy as np
+from collections import deque
+from gameModule import ByteGrid, EMPTY_CELL, SNAKE_CELL, WALL_CELL, FOOD_CELL, RIGHT, DOWN, LEFT, UP
+from hamiltonian import get_cycle
+
+# A move is given by its index in MOVES (same order as the agents of snakeAI.py), NO_MOVE keeps the previous move
+MOVES = [RIGHT, DOWN, LEFT, UP]
+NO_MOVE = -1
+MOVE_ROWS = np.array([move[0] for move in MOVES])
+MOVE_COLUMNS = np.array([move[1] for move in MOVES])
+
+
+class BatchSnakeGame:
+    def __init__(self, n_games, rows=20, columns=20, walls=(), seed=None):
+        """
+        :param n_games: The number of games played in lock-step
+        :param rows: The number of rows of every board
+        :param columns: The number of columns of every board
+        :param walls: The (row, column) positions of the walls, shared by all the boards
+        :param seed: Seed of the random generator used to spawn the snakes and the food
+        """
+        self.n_games = n_games
+        self.rows = rows
+        self.columns = columns
+        self.size = rows * columns
+        self.rng = np.random.default_rng(seed)
+        self.games = np.arange(n_games)
+
+        self.wall_cells = frozenset(walls)
+        self.walls = np.zeros(self.size, dtype=bool)
+        for i, j in self.wall_cells:
+            self.walls[i * columns + j] = True
+
+        # Cells are flattened: the cell (i, j) of game n is grid[n, i * columns + j]
+        self.grid = np.zeros((n_games, self.size), dtype=np.uint8)
+        # Ring buffer of the snake bodies, body[n, head_index[n]] is the head of game n
+        self.body = np.zeros((n_games, self.size), dtype=np.int64)
+        self.head_index = np.zeros(n_games, dtype=np.int64)
+        self.length = np.zeros(n_games, dtype=np.int64)
+        self.food = np.full(n_games, -1, dtype=np.int64)
+        self.previous_move = np.full(n_games, NO_MOVE, dtype=np.int64)
+        self.score = np.zeros(n_games, dtype=np.int64)
+        self.moves = np.zeros(n_games, dtype=np.int64)
+        self.alive = np.zeros(n_games, dtype=bool)
+
+    @property
+    def boards(self):
+        # (n_games, rows, columns) view on the grid
+        return self.grid.reshape(self.n_games, self.rows, self.columns)
+
+    @property
+    def heads(self):
+        return self.body[self.games, self.head_index]
+
+    def start_run(self):
+        self.grid[:] = np.where(self.walls, WALL_CELL, EMPTY_CELL)
+        self.head_index[:] = 0
+        self.length[:] = 1
+        self.food[:] = -1
+        self.previous_move[:] = NO_MOVE
+        self.score[:] = 0
+        self.moves[:] = 0
+        self.alive[:] = True
+
+        heads = self.random_cells(self.games)
+        self.alive[heads < 0] = False
+        games = self.games[heads >= 0]
+        self.body[games, 0] = heads[heads >= 0]
+        self.grid[games, heads[heads >= 0]] = SNAKE_CELL
+        self.spawn_food(games)
+
+    def random_cells(self, games):
+        """
+            Draws uniformly one empty cell in each of the given games.
+        :param games: The indices of the games
+        :return: The flat index of the drawn cell for each game, -1 if the game has no empty cell left
+        """
+        empty = self.grid[games] == EMPTY_CELL
+        keys = self.rng.random(empty.shape)
+        keys[~empty] = -1
+        cells = keys.argmax(axis=1)
+        cells[~empty.any(axis=1)] = -1
+        return cells
+
+    def spawn_food(self, games):
+        cells = self.random_cells(games)
+        self.alive[games[cells < 0]] = False
+        games = games[cells >= 0]
+        cells = cells[cells >= 0]
+        self.grid[games, cells] = FOOD_CELL
+        self.food[games] = cells
+
+    def step(self, moves, playing=None):
+        """
+            Moves every snake once.
+        :param moves: Array of n_games move indices (see MOVES), NO_MOVE or a move opposite to the previous one keeps
+                      the previous move, exactly like SnakeGame.move_snake
+        :param playing: Optional boolean mask of the games to advance, the other games are left untouched
+        :return: The boards, the scores and the alive flags
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        previous = self.previous_move
+        keep = (moves < 0) | ((previous >= 0) & (moves == (previous + 2) % 4))
+        moves = np.where(keep, previous, moves)
+
+        active = self.alive & (moves >= 0)
+        if playing is not None:
+            active &= playing
+        games = np.flatnonzero(active)
+        moves = moves[games]
+
+        head = self.body[games, self.head_index[games]]
+        i = head // self.columns + MOVE_ROWS[moves]
+        j = head % self.columns + MOVE_COLUMNS[moves]
+        inside = (0 <= i) & (i < self.rows) & (0 <= j) & (j < self.columns)
+        new_pos = np.where(inside, i * self.columns + j, 0)
+        cell = self.grid[games, new_pos]
+        collision = ~inside | (cell == SNAKE_CELL) | (cell == WALL_CELL)
+        self.alive[games[collision]] = False
+
+        games = games[~collision]
+        new_pos = new_pos[~collision]
+        self.previous_move[games] = moves[~collision]
+        self.moves[games] += 1
+
+        self.head_index[games] = (self.head_index[games] + 1) % self.size
+        self.body[games, self.head_index[games]] = new_pos
+        self.grid[games, new_pos] = SNAKE_CELL
+
+        ate = new_pos == self.food[games]
+        moving = games[~ate]
+        tails = self.body[moving, (self.head_index[moving] - self.length[moving]) % self.size]
+        self.grid[moving, tails] = EMPTY_CELL
+
+        eating = games[ate]
+        self.length[eating] += 1
+        self.score[eating] += 1
+        self.spawn_food(eating)
+
+        return self.boards, self.score, self.alive
+
+    def run(self, policy, max_score=100, max_moves=None):
+        """
+            Plays all the games until every snake is dead, reached max_score or did max_moves moves.
+        :param policy: Function taking this BatchSnakeGame and returning the array of moves of the next step
+        :return: The final scores and numbers of moves
+        """
+        self.start_run()
+        playing = self.alive & (self.score < max_score)
+        while playing.any():
+            self.step(policy(self), playing)
+            playing = self.alive & (self.score < max_score)
+            if max_moves is not None:
+                playing &= self.moves < max_moves
+        return self.score, self.moves
+
+    def get_game_state(self, n):
+        """
+            State of one game in the format of SnakeGame.get_state (a ByteGrid with the same cell codes, and the snake
+            as a deque, head first), to drive the per-game agents of agents.py.
+        """
+        grid = ByteGrid(self.rows, self.columns)
+        grid.cells[:] = self.grid[n].tobytes()
+        snake = deque(divmod(int(self.body[n, (self.head_index[n] - k) % self.size]), self.columns)
+                      for k in range(self.length[n]))
+        return grid, int(self.score[n]), bool(self.alive[n]), snake
+
+
+def random_policy(game):
+    return game.rng.integers(4, size=game.n_games)
+
+
+_cycle_tables = {}
+
+
+def sshape_policy(game):
+    """
+        Follows the Hamiltonian cycle of hamiltonian.py for the board layout (S-shaped when there are no walls).
+    """
+    key = (game.rows, game.columns, game.wall_cells)
+    if key not in _cycle_tables:
+        cycle = get_cycle(*key)
+        if cycle is None:
+            raise ValueError("No Hamiltonian cycle found for this board.")
+        _cycle_tables[key] = np.array(cycle.move_indices, dtype=np.int64)
+    return _cycle_tables[key][game.heads]
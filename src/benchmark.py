@@ -0,0 +1,218 @@
+### ---------- EXPLANATION ------------- ###
+# Benchmarks of the game engine and of the
+# planners, on fixed layouts: the snake lies along
+# the Hamiltonian cycle of the board (see
+# hamiltonian.py) with a given length, the food is
+# in the middle of the free part of the cycle and
+# all the random generators are seeded. The
+# results are written in a JSON file, and a
+# previous file can be given with --compare to
+# see the ratios between two commits.
+#
+# python benchmark.py -o after.json --compare before.json
+
+from gameModule import SnakeGame, TrainingSnakeGame, SNAKE_CHAR, FOOD_CHAR
+from hamiltonian import get_cycle
+from agents import ALGORITHMS, A_STAR_MODES, AStarAgent, make_agent
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+SEED = 171
+SIZES = [(20, 20), (50, 50), (100, 100)]
+SNAKE_FILLS = [0.05, 0.25, 0.5] # Lengths of the snake, as a fraction of the cells of the board
+MIN_LENGTH = 8 # The survival mode needs a snake longer than 6
+GRIDS = {'chars': False, 'compact': True}
+SEARCH_MODES = ['default', 'weighted', 'inverse', 'survival']
+TICKS = 1000 # Number of ticks played by each agent
+REPEAT = 3
+IMPORTS = ['gameModule', 'agents', 'snakeAI']
+
+
+def snake_length(rows, columns, fill):
+    return max(MIN_LENGTH, int(fill * rows * columns))
+
+
+def make_game(rows, columns, length, compact_grid=False):
+    """
+        Game with the snake laid along the Hamiltonian cycle of the board, its head in front, and the food in the
+        middle of the rest of the cycle.
+    :return: The game and the cycle
+    """
+    cycle = get_cycle(rows, columns)
+    order = sorted(((cycle.index[i * columns + j], (i, j)) for i in range(rows) for j in range(columns)))
+    order = [cell for index, cell in order]
+    game = SnakeGame(compact_grid, rows, columns, SEED)
+    game.alive = True
+    for cell in order[:length]:
+        game.snake.appendleft(cell)
+        game.set_cell(cell[0], cell[1], SNAKE_CHAR)
+    game.food = order[length + (len(order) - length) // 2]
+    game.set_cell(game.food[0], game.food[1], FOOD_CHAR)
+    return game, cycle
+
+
+def measure(function):
+    """
+        Time of one call of the function, in microseconds: the best of REPEAT loops of enough calls to last at least
+        0.2 second (see timeit.Timer.autorange).
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(REPEAT, number)) / number * 1000000
+
+
+def result(name, us_per_call, **parameters):
+    return dict(name=name, us_per_call=us_per_call, per_second=1000000 / us_per_call, **parameters)
+
+
+def bench_move_snake(rows, columns, length, grid):
+    game, cycle = make_game(rows, columns, length, GRIDS[grid])
+    game.remove_food() # the snake goes around the cycle without growing
+
+    def move():
+        game.set_next_move(cycle.next_move(game.snake[0]))
+        game.move_snake()
+    return result('move_snake', measure(move), size=[rows, columns], length=length, grid=grid)
+
+
+def bench_available_cells(rows, columns, length, grid):
+    game, cycle = make_game(rows, columns, length, GRIDS[grid])
+    return result('get_available_cells', measure(game.get_available_cells), size=[rows, columns], length=length,
+                  grid=grid)
+
+
+def bench_spawn(rows, columns, length, grid):
+    game, cycle = make_game(rows, columns, length, GRIDS[grid])
+
+    def spawn():
+        game.remove_food()
+        game.spawn_food()
+    return result('spawn_food', measure(spawn), size=[rows, columns], length=length, grid=grid)
+
+
+def bench_search(rows, columns, length, grid, mode):
+    game, cycle = make_game(rows, columns, length, GRIDS[grid])
+    agent = AStarAgent(game, mode=mode)
+    state = game.get_state()
+    if mode == 'survival':
+        search = lambda: agent.survival_mode(state)
+    else:
+        search = lambda: agent.astar(state, game.food, mode=mode)
+    return result('astar', measure(search), size=[rows, columns], length=length, grid=grid, mode=mode)
+
+
+def bench_ticks(rows, columns, algorithm):
+    """
+        Ticks per second of a TrainingSnakeGame played by the agent (a new game is started when the snake dies).
+    """
+    times = []
+    for _ in range(REPEAT):
+        agent = make_agent(algorithm, survival=algorithm in A_STAR_MODES, seed=SEED)
+        game = TrainingSnakeGame(agent, rows=rows, columns=columns, seed=SEED)
+        agent.set_game(game)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.start_run()
+            start_time = time.perf_counter()
+            for _ in range(TICKS):
+                if not game.is_alive():
+                    game.start_run()
+                game.next_tick()
+            times.append(time.perf_counter() - start_time)
+    return result('ticks', min(times) / TICKS * 1000000, size=[rows, columns], algorithm=algorithm)
+
+
+def bench_import(module):
+    """
+        Time to start a new interpreter and import the module.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(REPEAT):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import ' + module], cwd=directory, check=True)
+        times.append(time.perf_counter() - start_time)
+    return result('import', min(times) * 1000000, module=module)
+
+
+def run_benchmarks(sizes=SIZES):
+    """
+    :return: The list of the results, each one a dictionary with the name of the benchmark, its parameters, the time
+             of one call (us_per_call) and the number of calls per second
+    """
+    benchmarks = []
+    for rows, columns in sizes:
+        for fill in SNAKE_FILLS:
+            length = snake_length(rows, columns, fill)
+            for grid in GRIDS:
+                benchmarks.append(functools.partial(bench_move_snake, rows, columns, length, grid))
+                benchmarks.append(functools.partial(bench_available_cells, rows, columns, length, grid))
+                benchmarks.append(functools.partial(bench_spawn, rows, columns, length, grid))
+                for mode in SEARCH_MODES:
+                    benchmarks.append(functools.partial(bench_search, rows, columns, length, grid, mode))
+        for algorithm in ALGORITHMS:
+            benchmarks.append(functools.partial(bench_ticks, rows, columns, algorithm))
+    for module in IMPORTS:
+        benchmarks.append(functools.partial(bench_import, module))
+
+    results = []
+    for benchmark in benchmarks:
+        results.append(benchmark())
+        print(describe(results[-1]))
+    return results
+
+
+def key(result):
+    # The parameters of a result, to match it with the same benchmark of another file
+    return json.dumps({name: value for name, value in result.items() if name not in ('us_per_call', 'per_second')},
+                      sort_keys=True)
+
+
+def describe(result):
+    parameters = ' '.join('%s=%s' % (name, value) for name, value in result.items()
+                          if name not in ('name', 'us_per_call', 'per_second'))
+    return '%-20s %-55s %12.2f us %14.1f /s' % (result['name'], parameters, result['us_per_call'],
+                                                result['per_second'])
+
+
+def compare(results, baseline):
+    """
+        Prints the ratio of the time of each benchmark to its time in the baseline (> 1 means slower).
+    """
+    baseline = {key(result): result for result in baseline}
+    for result in results:
+        if key(result) in baseline:
+            print('%s %6.2fx' % (describe(result), result['us_per_call'] / baseline[key(result)]['us_per_call']))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+parser = argparse.ArgumentParser(description="Benchmarks of the game engine and of the planners.")
+parser.add_argument('-o', "--output", type=str, default='benchmark.json', help="JSON file of the results")
+parser.add_argument("--compare", type=str, help="JSON file of previous results to compare with")
+parser.add_argument("--quick", action='store_true', help="only the 20x20 board")
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    results = run_benchmarks(SIZES[:1] if args.quick else SIZES)
+    with open(args.output, 'w') as file:
+        json.dump({'commit': git_commit(), 'python': platform.python_version(), 'machine': platform.machine(),
+                   'seed': SEED, 'results': results}, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)['results'])
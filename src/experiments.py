@@ -0,0 +1,176 @@
+### ---------- EXPLANATION ------------- ###
+# Experiment runner: plays a matrix of training
+# games (algorithm, survival flag, board size,
+# seed) on a pool of processes sized to the
+# available cores. Each worker creates the game
+# and the agent itself, there is no new
+# interpreter per game, and the results of all
+# the games go in one .npz file. A configuration
+# can be stopped early once the confidence
+# interval of its mean score is tight enough.
+# Every game is reproducible from its seed alone
+# (see seed_streams).
+
+import multiprocessing
+import os
+import queue
+import time
+import numpy as np
+
+from gameModule import TrainingSnakeGame
+from agents import ALGORITHMS, make_agent
+from results import Run, ResultsSink
+from profiling import Profiler
+
+
+def experiment_matrix(algorithms=tuple(ALGORITHMS), survival=(False,), sizes=((20, 20),), seeds=range(30)):
+    """
+        All the combinations of the given parameters.
+    :return: The list of the (algorithm, survival, (rows, columns), seed) configurations
+    """
+    return [(algorithm, survival_flag, size, seed)
+            for algorithm in algorithms for survival_flag in survival for size in sizes for seed in seeds]
+
+
+def run_name(algorithm, survival, size):
+    """
+        Name of the runs of a configuration. The default 20x20 size is not written so that the
+        names stay the ones expected by forGraphs.py.
+    """
+    name = algorithm
+    if survival:
+        name += '_survival'
+    if tuple(size) != (20, 20):
+        name += '_%ix%i' % tuple(size)
+    return name
+
+
+def seed_streams(seed):
+    """
+        Derives two independent seeds from the seed of a game: one for the game (food spawning) and one for the
+        agent (random algorithm), so that a single number reproduces the whole game, whatever the process it is
+        played in.
+    :param seed: The seed of the game, None for a non reproducible game
+    :return: The seed of the game generator and the seed of the agent generator
+    """
+    if seed is None:
+        return None, None
+    game_stream, agent_stream = np.random.SeedSequence(seed).spawn(2)
+    return int(game_stream.generate_state(1)[0]), int(agent_stream.generate_state(1)[0])
+
+
+def train(agent, compact_grid=False, rows=20, columns=20, max_score=100, seed=None, replay_path=None):
+    """
+        Plays one training game with the agent. Only the moves at which the score changes are recorded.
+    :param agent: The agent playing the game
+    :param max_score: The game is stopped when this score is reached
+    :param seed: Seed of the random generator of the game (see seed_streams)
+    :param replay_path: If given, the game is recorded and its replay is written in this file (see replay.py)
+    :return: The moves at which the score changed (starting with 0), the scores reached at these moves (starting
+             with 0), the number of moves played and the time taken
+    """
+    game = TrainingSnakeGame(agent, compact_grid=compact_grid, rows=rows, columns=columns, seed=seed)
+    agent.set_game(game)
+    if replay_path is not None:
+        game.record_replay()
+    game.start_run()
+    start_time = time.time()
+
+    counts = [0]
+    scores = [0]
+    count = 0
+    while game.is_alive() and game.score < max_score:
+        game.next_tick()
+        count += 1
+        if game.score != scores[-1]:
+            counts.append(count)
+            scores.append(game.score)
+    print('Game not alive')
+    if replay_path is not None:
+        game.replay.save(replay_path)
+    return counts, scores, count, time.time() - start_time
+
+
+def run_game(config, profile=False, replay_dir=None):
+    """
+        Plays one training game in this process.
+    :param config: The (algorithm, survival, (rows, columns), seed) configuration
+    :param profile: Instrument the agent (see profiling.py)
+    :param replay_dir: If given, the replay of the game is written in this directory, in name_seed.npz
+    :return: The Run
+    """
+    algorithm, survival, (rows, columns), seed = config
+    game_seed, agent_seed = seed_streams(seed)
+    agent = make_agent(algorithm, survival=survival, seed=agent_seed)
+    profiler = None
+    if profile:
+        profiler = Profiler()
+        agent.instrument(profiler)
+    name = run_name(algorithm, survival, (rows, columns))
+    replay_path = None
+    if replay_dir is not None:
+        replay_path = os.path.join(replay_dir, '%s_%s.npz' % (name, seed))
+    counts, scores, total_moves, time_taken = train(agent, rows=rows, columns=columns, seed=game_seed,
+                                                    replay_path=replay_path)
+    return Run(name, seed, counts, scores, total_moves, time_taken, profiler)
+
+
+def converged(summary, ci_width, min_runs):
+    """
+        Whether a configuration has enough runs: at least min_runs, and a 95% confidence interval of the mean
+        score narrower than ci_width (half width).
+    """
+    return summary['runs'] >= min_runs and summary['score ci'] <= ci_width
+
+
+def print_summary(summary):
+    for name, statistics in sorted(summary.items()):
+        print('%s: %i runs, score %.2f +- %.2f, %.1f moves, %.1f us per move'
+              % (name, statistics['runs'], statistics['score mean'], statistics['score ci'],
+                 statistics['moves mean'], statistics['time per move']))
+
+
+def run_experiments(configs, output, processes=None, ci_width=None, min_runs=10, profile=False, replay_dir=None):
+    """
+        Plays all the configurations on a pool of processes. The runs are buffered and written at the end in a
+        single .npz file (see results.ResultsSink), and the statistics of each configuration are updated as the
+        runs come in.
+    :param configs: The configurations to play (see experiment_matrix)
+    :param output: The .npz file of the results, its directory is created if needed
+    :param processes: The number of worker processes, the number of cores if None
+    :param ci_width: If given, the remaining seeds of a configuration are skipped once the 95% confidence interval
+                     of its mean score is narrower than ci_width (see converged)
+    :param min_runs: The minimum number of runs of a configuration before it can be stopped early
+    :param profile: Record the latencies and search counters of the agents, written with the results
+    :param replay_dir: If given, the replay of every game is written in this directory (see run_game)
+    :return: The list of the runs
+    """
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    if replay_dir is not None:
+        os.makedirs(replay_dir, exist_ok=True)
+    processes = processes or os.cpu_count() or 1
+    done = queue.Queue()
+    pending = iter(configs)
+
+    with multiprocessing.Pool(processes) as pool, ResultsSink(output) as sink:
+        def submit():
+            # Games are submitted one at a time (as many as workers) so that the skipped seeds are never started
+            for config in pending:
+                name = run_name(*config[:3])
+                if ci_width is not None and name in sink.aggregates and \
+                        converged(sink.aggregates[name].summary(), ci_width, min_runs):
+                    continue
+                pool.apply_async(run_game, (config, profile, replay_dir), callback=done.put, error_callback=done.put)
+                return True
+            return False
+
+        running = sum(submit() for _ in range(processes))
+        while running:
+            run = done.get()
+            if isinstance(run, BaseException):
+                raise run
+            sink.add(run)
+            print('[%i/%i] %s_%i done' % (len(sink.runs), len(configs), run.name, run.seed))
+            running += submit() - 1
+        print_summary(sink.summary())
+    return sink.runs
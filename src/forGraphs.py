@@ -3,68 +3,41 @@
 # in the report.
 
 import matplotlib.pyplot as plt
+from matplotlib.patches import Ellipse
 import numpy as np
-import csv
+from results import load_results, load_csv_results
 
-NUM_SAMPLES = 30 # Defines the number of files per algorithm (set in main.py)
+NUM_SAMPLES = 30 # Defines the number of files per algorithm (set in main.py), only used for the old csv files
 
 
 # The "#%%" makes separate cells that can be ran individually
 
 # %%
-file_path = './out4/' # Directory with the csv files
-names = ['random', 'sshaped', 'astar', 'inverse', 'weighted'] # The names of the files (without "_[number]")
+file_path = './survival/results.npz' # File written by main.py (or a directory with the old csv files)
+names = ['random', 'sshaped', 'astar', 'inverse', 'weighted'] # The names of the runs (without "_[number]")
 colors = ['k', 'g', 'b', 'm', 'c'] # Some colors for the graphs
 
 
-# Here we put all the values in a big dictionary. For example, big_dictionary['astar'][1] will
-# be a 2-dim numpy array with the values of the corresponding file (astar_1.csv)
-# The time_dictionary is of the form: time_dictionary['astar'] is a list of 2-list where each 
-# 2-list is [max number of moves, time taken]
+# Here we load all the runs in one pass. results['astar'] holds the runs of astar as numpy arrays:
+# results['astar'].curves[i] is the score at each move of the i-th run (padded with NaN after its
+# end), and total_moves, final_scores and times give one value per run.
 
-big_dictionary = {}
-time_dictionary = {}
-for name in names:
-    big_dictionary[name] = {}
-    time_dictionary[name] = []
-
-    for i in range(NUM_SAMPLES):
-        filename = file_path+name+'_'+str(i)+'.csv'
-        with open(filename, 'r') as csvfile:
-            csvfile.readline()
-            reader = csv.reader(csvfile)
-            data = []
-            big_dictionary[name][i] = [[int(row[0]), float(row[1])] for row in reader if row]
-            time_dictionary[name].append(big_dictionary[name][i].pop(-1))
-            big_dictionary[name][i] = np.asarray(big_dictionary[name][i])
+if file_path.endswith('.npz'):
+    results = load_results(file_path)
+else:
+    results = load_csv_results(file_path, names, NUM_SAMPLES)
 
 # %%
 
-# Here we create dictionaries with the mean values. Note that the operation is a little bit 
-# more complex than a simple "np.mean" because not all numpy arrays have the same sizes, 
-# hence the use of masked arrays.
+# Here we create dictionaries with the mean values. As the runs do not have the same lengths, the
+# curves are padded with NaN and the means are taken over the runs still playing at each move.
 
 mean_dictionary = {}
 mean_time_dictionary = {}
 
 for name in names:
-    maxlen = max([len(big_dictionary[name][i]) for i in range(NUM_SAMPLES)])
-    arr = np.ma.empty((maxlen, 2, NUM_SAMPLES))
-    arr.mask = True
-
-    for i in range(NUM_SAMPLES):
-        x = big_dictionary[name][i]
-        arr[:x.shape[0], :x.shape[1], i] = x
-
-    mean_masked_array = (arr.mean(axis=2))
-    mean_dictionary[name] = mean_masked_array.data
-
-    temp_array = []
-    for two in time_dictionary[name]:
-        one_mean = two[1]/two[0]
-        temp_array.append(one_mean)
-
-    mean_time_dictionary[name] = np.mean(temp_array)*1000000
+    mean_dictionary[name] = results[name].mean_curve()
+    mean_time_dictionary[name] = results[name].mean_time_per_move()
 
 
 # %%
@@ -74,9 +47,10 @@ for name in names:
 plt.figure(figsize=(13, 11))
 for name, color in zip(names, colors):
 
-    for i in range(NUM_SAMPLES):
-        plt.plot(big_dictionary[name][i][:, 0], big_dictionary[name][i][:, 1], color, linewidth=0.17)
-    plt.plot(mean_dictionary[name][:, 0], mean_dictionary[name][:, 1], color, label=name, linewidth=1)
+    moves = np.arange(results[name].curves.shape[1])
+    for curve in results[name].curves:
+        plt.plot(moves, curve, color, linewidth=0.17)
+    plt.plot(moves, mean_dictionary[name], color, label=name, linewidth=1)
 plt.legend(prop={'size': 20})
 plt.xlabel('Number of moves', fontsize=14)
 plt.ylabel('Score', fontsize=14)
@@ -106,11 +80,7 @@ plt.show()
 end_dictionary = {}
 
 for name in names:
-    end_dictionary[name] = {}
-    end_dictionary[name]['moves mean'] = np.mean([big_dictionary[name][i][-1, 0] for i in range(NUM_SAMPLES)])
-    end_dictionary[name]['score mean'] = np.mean([big_dictionary[name][i][-1, 1] for i in range(NUM_SAMPLES)])
-    end_dictionary[name]['moves var'] = np.var([big_dictionary[name][i][-1, 0] for i in range(NUM_SAMPLES)])
-    end_dictionary[name]['score var'] = np.var([big_dictionary[name][i][-1, 1] for i in range(NUM_SAMPLES)])
+    end_dictionary[name] = results[name].end_statistics()
 
 plt.figure(figsize=(13, 11))
 ax = plt.gca()
@@ -3,10 +3,16 @@
 # This file is the implementation of the snake game found on github.
 
 
-import pygame, random, time
+import queue, random, threading, time
+from collections import deque
+
+pygame = None # imported by load_pygame, only when a GUISnakeGame is created
 
 TITLE = "snAIke!"
 FPS = 30
+TURBO_BUDGET = 0.8 # Part of the time of a frame used to play moves in turbo mode, the rest is left to the drawing
+TRACE_SPEED = 10 # Number of A* steps (expanded nodes and path cells) shown per second by the interactive mode
+PLAN_WAIT = 0.5 / FPS # Time a frame waits for the move of the agent before drawing without it
 BLACK = (50, 50, 50)
 GREY = (120, 120, 120)
 WHITE = (200, 200, 200)
@@ -27,14 +33,221 @@ NEW_CHAR = 'A'
 S_CHAR = 'S'
 CLOSED_CHAR = 'C'
 
+# Integer cell codes used by the compact grid backend. The code of a cell is the index of its character in CELL_CHARS.
+EMPTY_CELL = 0
+SNAKE_CELL = 1
+WALL_CELL = 2
+FOOD_CELL = 3
+NEW_CELL = 4
+S_CELL = 5
+CLOSED_CELL = 6
+CELL_CHARS = EMPTY_CHAR + SNAKE_CHAR + WALL_CHAR + FOOD_CHAR + NEW_CHAR + S_CHAR + CLOSED_CHAR
+CELL_CODES = {char: code for code, char in enumerate(CELL_CHARS)}
+CELL_COLORS = {WALL_CHAR: WHITE, SNAKE_CHAR: YELLOW, FOOD_CHAR: RED, NEW_CHAR: GREEN, S_CHAR: PURPLE,
+               CLOSED_CHAR: ORANGE}
+
+
+class CharGrid(list):
+    """
+        Historical grid layout: a list of rows, each row being a list of one-char strings.
+        grid[i][j] reads and writes characters directly.
+    """
+
+    def __init__(self, rows, columns):
+        super(CharGrid, self).__init__([EMPTY_CHAR] * columns for i in range(rows))
+        self.rows = rows
+        self.columns = columns
+
+    def get(self, i, j):
+        return self[i][j]
+
+    def set(self, i, j, char):
+        self[i][j] = char
+
+    def is_free(self, i, j):
+        # A cell the snake can move into without dying
+        return self[i][j] in (EMPTY_CHAR, FOOD_CHAR)
+
+    def is_blocked(self, i, j):
+        # A cell the path finding algorithms can not go through
+        char = self[i][j]
+        return char == SNAKE_CHAR or char == WALL_CHAR
+
+    def available_cells(self):
+        return [(i, j) for i in range(self.rows) for j in range(self.columns) if self[i][j] == EMPTY_CHAR]
+
+    def occupied_cells(self):
+        for i in range(self.rows):
+            row = self[i]
+            for j in range(self.columns):
+                if row[j] != EMPTY_CHAR:
+                    yield i, j, row[j]
+
+    def reset(self):
+        for row in self:
+            for j in range(self.columns):
+                row[j] = EMPTY_CHAR
+
+
+class ByteGridRow:
+    """
+        Compatibility view on one row of a ByteGrid, so that grid[i][j] keeps returning (and accepting) characters.
+    """
+    __slots__ = ('cells', 'start', 'columns')
+
+    def __init__(self, cells, start, columns):
+        self.cells = cells
+        self.start = start
+        self.columns = columns
+
+    def __len__(self):
+        return self.columns
+
+    def __getitem__(self, j):
+        if isinstance(j, slice):
+            return [CELL_CHARS[code] for code in self.cells[self.start:self.start + self.columns][j]]
+        if j < 0:
+            j += self.columns
+        if not 0 <= j < self.columns:
+            raise IndexError('grid row index out of range')
+        return CELL_CHARS[self.cells[self.start + j]]
+
+    def __setitem__(self, j, char):
+        if j < 0:
+            j += self.columns
+        if not 0 <= j < self.columns:
+            raise IndexError('grid row index out of range')
+        self.cells[self.start + j] = CELL_CODES[char]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+class ByteGrid:
+    """
+        Compact grid backend: one flat bytearray of integer cell codes (see CELL_CHARS), stored row by row.
+        The get/set/is_* methods work on the codes directly, grid[i][j] goes through a ByteGridRow view.
+    """
+    __slots__ = ('rows', 'columns', 'cells')
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.cells = bytearray(rows * columns)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(self.rows)[i]]
+        if i < 0:
+            i += self.rows
+        if not 0 <= i < self.rows:
+            raise IndexError('grid index out of range')
+        return ByteGridRow(self.cells, i * self.columns, self.columns)
+
+    def __iter__(self):
+        for i in range(self.rows):
+            yield ByteGridRow(self.cells, i * self.columns, self.columns)
+
+    def get(self, i, j):
+        return CELL_CHARS[self.cells[i * self.columns + j]]
+
+    def set(self, i, j, char):
+        self.cells[i * self.columns + j] = CELL_CODES[char]
+
+    def get_code(self, i, j):
+        return self.cells[i * self.columns + j]
+
+    def set_code(self, i, j, code):
+        self.cells[i * self.columns + j] = code
+
+    def is_free(self, i, j):
+        code = self.cells[i * self.columns + j]
+        return code == EMPTY_CELL or code == FOOD_CELL
+
+    def is_blocked(self, i, j):
+        code = self.cells[i * self.columns + j]
+        return code == SNAKE_CELL or code == WALL_CELL
+
+    def available_cells(self):
+        cells = self.cells
+        columns = self.columns
+        available_cells = []
+        k = cells.find(EMPTY_CELL)
+        while k != -1:
+            available_cells.append(divmod(k, columns))
+            k = cells.find(EMPTY_CELL, k + 1)
+        return available_cells
+
+    def occupied_cells(self):
+        columns = self.columns
+        for k, code in enumerate(self.cells):
+            if code:
+                yield k // columns, k % columns, CELL_CHARS[code]
+
+    def reset(self):
+        self.cells[:] = bytes(len(self.cells))
+
+
+class FreeCells:
+    """
+        Index of the empty cells of the grid. The cells are kept in a list and a dictionary maps each cell to its slot
+        in that list, so adding, removing (swap with the last cell) and sampling a cell are all O(1).
+    """
+    __slots__ = ('cells', 'slots')
+
+    def __init__(self, cells=()):
+        self.cells = list(cells)
+        self.slots = {cell: k for k, cell in enumerate(self.cells)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.slots
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def add(self, cell):
+        if cell not in self.slots:
+            self.slots[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        slot = self.slots.pop(cell, None)
+        if slot is not None:
+            last = self.cells.pop()
+            if slot < len(self.cells):
+                self.cells[slot] = last
+                self.slots[last] = slot
+
+    def sample(self, rng):
+        if self.cells:
+            return self.cells[rng.randrange(len(self.cells))]
+        return None
+
 
 class SnakeGame:
-    def __init__(self):
+    def __init__(self, compact_grid=False, rows=20, columns=20, seed=None):
+        """
+        :param compact_grid: Use the compact (bytearray) grid backend instead of lists of characters
+        :param rows: The number of rows of the grid
+        :param columns: The number of columns of the grid
+        :param seed: Seed of the random generator of this game (spawning of the snake and of the food)
+        """
         self.run = True
-        self.rows = 20
-        self.columns = 20
-        self.grid = [[' ' for j in range(self.rows)] for i in range(self.columns)]
-        self.snake = []
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.recording = False
+        self.replay = None # replay.Replay of the current run, if recording
+        self.rows = rows
+        self.columns = columns
+        self.compact_grid = compact_grid
+        self.init_grid()
+        self.snake = deque()  # head first, so that moving is an appendleft and a pop
         self.previous_move = None
         self.next_move = None
         self.food = None
@@ -66,100 +279,98 @@ class SnakeGame:
     def get_mps(self):
         return self.mps
 
+    def init_grid(self):
+        if self.compact_grid:
+            self.grid = ByteGrid(self.rows, self.columns)
+        else:
+            self.grid = CharGrid(self.rows, self.columns)
+        self.free_cells = FreeCells(self.grid.available_cells())
+        self.walls = frozenset()  # replaced (not mutated) when the walls change, so it can be used as a cache key
+
+    def set_cell(self, i, j, char):
+        # Every write of the game goes through here to keep the free cells index up to date
+        self.grid.set(i, j, char)
+        if char == EMPTY_CHAR:
+            self.free_cells.add((i, j))
+        else:
+            self.free_cells.discard((i, j))
+
     def reset_grid(self):
-        for i in range(20):
-            for j in range(20):
-                self.grid[i][j] = EMPTY_CHAR
+        self.grid.reset()
+        self.free_cells = FreeCells(self.grid.available_cells())
+        self.walls = frozenset()
         self.score = 0
         self.best_score = 0
 
     def expand_row(self):
         if self.rows < 100:
             self.rows += 1
-        self.grid = []
-        for i in range(self.rows):
-            self.grid.append([])
-            for j in range(self.columns):
-                self.grid[i].append(EMPTY_CHAR)
+        self.init_grid()
         self.score = 0
         self.best_score = 0
 
     def expand_column(self):
         if self.columns < 100:
             self.columns += 1
-        self.grid = []
-        for i in range(self.rows):
-            self.grid.append([])
-            for j in range(self.columns):
-                self.grid[i].append(EMPTY_CHAR)
+        self.init_grid()
         self.score = 0
         self.best_score = 0
 
     def shrink_row(self):
         if self.rows > 1:
             self.rows -= 1
-        self.grid = []
-        for i in range(self.rows):
-            self.grid.append([])
-            for j in range(self.columns):
-                self.grid[i].append(EMPTY_CHAR)
+        self.init_grid()
         self.score = 0
         self.best_score = 0
 
     def shrink_column(self):
         if self.columns > 1:
             self.columns -= 1
-        self.grid = []
-        for i in range(self.rows):
-            self.grid.append([])
-            for j in range(self.columns):
-                self.grid[i].append(EMPTY_CHAR)
+        self.init_grid()
         self.score = 0
         self.best_score = 0
 
     def is_alive(self):
         return self.alive
 
+    def record_replay(self):
+        """
+            Records the next runs: each start_run creates a new replay.Replay in self.replay, which gets the moves of
+            the run.
+        """
+        self.recording = True
+
     def remove_food(self):
-        if self.food is not None and self.grid[self.food[0]][self.food[1]] == FOOD_CHAR:
-            self.grid[self.food[0]][self.food[1]] = EMPTY_CHAR
+        if self.food is not None and self.grid.get(self.food[0], self.food[1]) == FOOD_CHAR:
+            self.set_cell(self.food[0], self.food[1], EMPTY_CHAR)
         self.food = None
 
     def remove_snake(self):
         for i in range(len(self.snake)):
             pos = self.snake.pop()
-            if self.grid[pos[0]][pos[1]] == SNAKE_CHAR:
-                self.grid[pos[0]][pos[1]] = EMPTY_CHAR
+            if self.grid.get(pos[0], pos[1]) == SNAKE_CHAR:
+                self.set_cell(pos[0], pos[1], EMPTY_CHAR)
 
     def get_available_cells(self):
-        available_cells = []
-        for i in range(self.rows):
-            for j in range(self.columns):
-                if self.grid[i][j] == EMPTY_CHAR:
-                    available_cells.append((i, j))
-        return available_cells
+        return list(self.free_cells)
 
     def get_random_cell(self):
-        random_cell = None
-        available_cells = self.get_available_cells()
-        if len(available_cells) > 0:
-            random_cell = random.choice(available_cells)
-        return random_cell
+        return self.free_cells.sample(self.rng)
 
     def spawn_snake(self):
         random_cell = self.get_random_cell()
         if random_cell is None:
             self.alive = False
         else:
-            self.snake.insert(0, random_cell)
-            self.grid[random_cell[0]][random_cell[1]] = SNAKE_CHAR
+            self.snake.appendleft(random_cell)
+            self.set_cell(random_cell[0], random_cell[1], SNAKE_CHAR)
 
     def spawn_food(self):
         random_cell = self.get_random_cell()
         if random_cell is None:
             self.alive = False
         else:
-            self.grid[random_cell[0]][random_cell[1]] = FOOD_CHAR
+            self.set_cell(random_cell[0], random_cell[1], FOOD_CHAR)
             self.food = random_cell
 
     def start_run(self):
@@ -169,6 +380,9 @@ class SnakeGame:
         self.score = 0
         self.previous_move = None
         self.next_move = None
+        if self.recording:
+            from replay import Replay
+            self.replay = Replay.from_game(self)
         self.spawn_snake()
         self.spawn_food()
         self.start_time = time.time()
@@ -179,8 +393,7 @@ class SnakeGame:
         self.next_move = move
 
     def is_collision(self, pos):
-        return not (0 <= pos[0] < self.rows and 0 <= pos[1] < self.columns and self.grid[pos[0]][pos[1]] in [EMPTY_CHAR,
-                                                                                                             FOOD_CHAR])
+        return not (0 <= pos[0] < self.rows and 0 <= pos[1] < self.columns and self.grid.is_free(pos[0], pos[1]))
 
     def is_next_move_invalid(self):
         if self.previous_move is not None:
@@ -191,6 +404,8 @@ class SnakeGame:
             self.next_move = self.previous_move
 
         if self.next_move is not None:
+            if self.replay is not None:
+                self.replay.add_move(self.next_move)
             head = self.snake[0]
             new_pos = (head[0] + self.next_move[0], head[1] + self.next_move[1])
             if self.is_collision(new_pos):
@@ -198,14 +413,14 @@ class SnakeGame:
                 if self.score > self.best_score:
                     self.best_score = self.score
             else:
-                self.snake.insert(0, new_pos)
-                self.grid[new_pos[0]][new_pos[1]] = SNAKE_CHAR
+                self.snake.appendleft(new_pos)
+                self.set_cell(new_pos[0], new_pos[1], SNAKE_CHAR)
                 if new_pos == self.food:
                     self.score += 1
                     self.spawn_food()
                 else:
                     tail = self.snake.pop()
-                    self.grid[tail[0]][tail[1]] = EMPTY_CHAR
+                    self.set_cell(tail[0], tail[1], EMPTY_CHAR)
                 self.previous_move = self.next_move
                 self.next_move = None
 
@@ -214,6 +429,13 @@ class SnakeGame:
     def get_state(self):
         return self.grid, self.score, self.alive, self.snake
 
+    def show_search(self, trace):
+        """
+            Called by the interactive A* with the trace of a search: the list of the (char, position) marks to show
+            in order. Only a GUISnakeGame displays it.
+        """
+        pass
+
     def get_grid_base(self, width, height):
         menu_start = width * 2 / 3
         vertical_gap = (height - 1) // self.rows
@@ -233,38 +455,213 @@ class SnakeGame:
     def add_wall(self, pos):
         i, j = self.get_coord(self.screen, pos)
         if 0 <= i < self.rows and 0 <= j < self.columns:
-            self.grid[i][j] = WALL_CHAR
+            self.set_cell(i, j, WALL_CHAR)
+            if (i, j) not in self.walls:
+                self.walls = self.walls | {(i, j)}
         self.score = 0
         self.best_score = 0
 
     def remove(self, pos):
         i, j = self.get_coord(self.screen, pos)
         if 0 <= i < self.rows and 0 <= j < self.columns:
-            self.grid[i][j] = EMPTY_CHAR
+            self.set_cell(i, j, EMPTY_CHAR)
+            if (i, j) in self.walls:
+                self.walls = self.walls - {(i, j)}
         self.score = 0
         self.best_score = 0
 
 
+def load_pygame():
+    """
+        Imports pygame the first time it is needed, so that headless games (TrainingSnakeGame) do not pay for its
+        import and do not need a display-capable pygame installed.
+    """
+    global pygame
+    if pygame is None:
+        import pygame as pygame_module
+        pygame = pygame_module
+    return pygame
+
+
+class Planner:
+    """
+        Daemon thread computing the next moves of an agent, one request at a time: quitting the game does not wait
+        for a search still running, and a move does not pay for starting a new thread.
+    """
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.answers = queue.Queue()
+        self.n_requests = 0
+        self.pending = None # Number of the request whose answer is awaited
+        self.answer = None # (move, error) answered to the pending request
+        self.thread = threading.Thread(target=self.run, name='planner', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            number, learning_agent, state = self.requests.get()
+            try:
+                self.answers.put((number, learning_agent.choose_next_move(state), None))
+            except Exception as error:
+                self.answers.put((number, None, error))
+
+    def request(self, learning_agent, state):
+        self.n_requests += 1
+        self.pending = self.n_requests
+        self.answer = None
+        self.requests.put((self.pending, learning_agent, state))
+
+    def cancel(self):
+        # The answer to the pending request is dropped when it comes
+        self.pending = None
+        self.answer = None
+
+    def wait(self, timeout):
+        """
+        :return: True if the answer to the pending request is ready
+        """
+        deadline = time.perf_counter() + timeout
+        while self.answer is None:
+            try:
+                number, move, error = self.answers.get(timeout=max(0, deadline - time.perf_counter()))
+            except queue.Empty:
+                return False
+            if number == self.pending:
+                self.answer = (move, error)
+        return True
+
+    def result(self):
+        move, error = self.answer
+        self.cancel()
+        if error is not None:
+            raise error
+        return move
+
+
 class GUISnakeGame(SnakeGame):
     DEFAULT_WIDTH = 900
     DEFAULT_HEIGHT = 600
     DEFAULT_TITLE_FONT_SIZE = 40
     DEFAULT_FONT_SIZE = 20
 
-    def __init__(self):
-        super(GUISnakeGame, self).__init__()
+    def __init__(self, compact_grid=False, rows=20, columns=20, seed=None, frame_skip=1, turbo=False,
+                 trace_speed=TRACE_SPEED):
+        """
+        :param frame_skip: AI mode only: number of moves played between two frames
+        :param turbo: AI mode only: play as many moves as the agent can compute during a frame (toggled with T)
+        :param trace_speed: Interactive mode only: number of A* steps shown per second (see show_search)
+        """
+        super(GUISnakeGame, self).__init__(compact_grid, rows, columns, seed)
+        load_pygame()
         self.frame = 0
+        self.frame_skip = frame_skip
+        self.turbo = turbo
+        # Searches of the interactive mode: the marks still to show, and the marks shown over the grid (the grid
+        # itself is never modified). The snake waits until a search has been shown to move.
+        self.trace = deque()
+        self.overlay = {}
+        self.trace_speed = trace_speed
+        self.trace_steps = 0.0
+        # In AI mode the agent computes its moves in a background thread, so that a long search does not freeze the
+        # window. While a move is not ready, the snake waits on its cell and the frames go on. Nothing else moves the
+        # snake in AI mode (the arrow keys are ignored), so the state read by the agent does not change until it
+        # answers and its plan stays valid. The planner thread is started by the first request.
+        self.planner = None
+        # The grid lines and the walls are drawn once on the background surface, which is rebuilt when the window,
+        # the size of the grid or the walls change. While the snake moves, only the cells written since the last
+        # frame (dirty_cells) and the menu are drawn again.
+        self.background = None
+        self.background_key = None
+        self.dirty_cells = set()
+        self.full_redraw = True
+        # Rendered text of each label of the menu: label -> ((text, font size), surface)
+        self.text_surfaces = {}
+
+    def set_cell(self, i, j, char):
+        super(GUISnakeGame, self).set_cell(i, j, char)
+        self.dirty_cells.add((i, j))
+
+    def invalidate(self):
+        # The next draw redraws the whole screen (for the writes to the grid that do not go through set_cell)
+        self.full_redraw = True
 
     def next_tick(self, learning_agent=None):
+        frame_start = time.perf_counter()
         self.process_event(learning_agent)
-        if self.is_alive() and (self.frame / FPS >= 1 / self.get_mps() or learning_agent is not None):
+        if self.trace or self.overlay:
+            self.play_trace()
+        if learning_agent is not None:
+            can_move = self.next_move is not None
+        else:
+            can_move = self.frame / FPS >= 1 / self.get_mps()
+        if self.is_alive() and not self.trace and can_move:
             self.move_snake()
             self.frame = 0
+            if learning_agent is not None:
+                self.play_moves(learning_agent, frame_start)
         # drawing on screen
         self.draw()
         self.clock.tick(FPS)
         self.frame += 1
 
+    def play_moves(self, learning_agent, frame_start):
+        """
+            Plays the other moves of the frame in AI mode: frame_skip - 1 more moves, and in turbo mode as many moves
+            as possible until TURBO_BUDGET of the frame time is spent. Only the last state is drawn.
+        """
+        moves = 1
+        deadline = frame_start + TURBO_BUDGET / FPS
+        while self.is_alive() and (moves < self.frame_skip or (self.turbo and time.perf_counter() < deadline)):
+            if not self.request_move(learning_agent, max(PLAN_WAIT, deadline - time.perf_counter())):
+                break # the move will be played in a next frame
+            if self.trace:
+                break # the move is played once the search has been shown
+            self.move_snake()
+            moves += 1
+
+    def request_move(self, learning_agent, timeout=PLAN_WAIT):
+        """
+            Asks the agent for its next move in the planner thread, and waits for it at most timeout seconds.
+        :return: True if the move is ready (it is then the next move of the game), False if the agent is still
+                 computing it (the same computation is checked again by the next calls)
+        """
+        if self.planner is None:
+            self.planner = Planner()
+        if self.planner.pending is None:
+            self.planner.request(learning_agent, self.get_state())
+        if not self.planner.wait(timeout):
+            return False
+        self.set_next_move(self.planner.result())
+        return True
+
+    def start_run(self):
+        if self.planner is not None:
+            self.planner.cancel() # a move computed for the previous run is dropped
+        super(GUISnakeGame, self).start_run()
+
+    def show_search(self, trace):
+        self.trace.extend(trace)
+
+    def play_trace(self):
+        """
+            Shows the next marks of the searches at trace_speed steps per second: the expanded nodes and the path
+            cells take one step each, the generated nodes are shown with the step that follows them. Once a search
+            has been fully shown, its marks are removed on the next frame.
+        """
+        if not self.trace:
+            self.dirty_cells.update(self.overlay)
+            self.overlay.clear()
+            return
+        self.trace_steps += self.trace_speed / FPS
+        while self.trace and (self.trace_steps >= 1 or self.trace[0][0] == S_CHAR):
+            char, position = self.trace.popleft()
+            if char != S_CHAR:
+                self.trace_steps -= 1
+            self.overlay[position] = char
+            self.dirty_cells.add(position)
+        if not self.trace:
+            self.trace_steps = 0.0
+
     def process_event(self, learning_agent=None):
         # triggering an event
         for event in pygame.event.get():
@@ -274,6 +671,8 @@ class GUISnakeGame(SnakeGame):
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_q:
                     self.stop_running()
+                if event.key == pygame.K_t and learning_agent is not None:
+                    self.turbo = not self.turbo # the speed of the player mode is set with U and I
                 if not self.is_alive():
                     # start the run
                     if event.key == pygame.K_SPACE:
@@ -297,8 +696,9 @@ class GUISnakeGame(SnakeGame):
                     elif event.key == pygame.K_SEMICOLON:
                         self.shrink_column()
 
-                if self.is_alive():
-                    # controls snake
+                if self.is_alive() and learning_agent is None:
+                    # controls snake (in AI mode the moves come only from the agent, a key would play a move under
+                    # its planned path)
                     if event.key == pygame.K_UP:
                         self.set_next_move(UP)
                     elif event.key == pygame.K_RIGHT:
@@ -322,8 +722,9 @@ class GUISnakeGame(SnakeGame):
                     pos = pygame.mouse.get_pos()
                     self.remove(pos)
 
-        if self.is_alive() and learning_agent is not None:
-            self.set_next_move(learning_agent.choose_next_move(self.get_state()))
+        # a move computed during the previous frames may still be waiting for its search to be shown
+        if self.is_alive() and learning_agent is not None and self.next_move is None:
+            self.request_move(learning_agent)
 
     def init_pygame(self):
         pygame.init()
@@ -335,32 +736,47 @@ class GUISnakeGame(SnakeGame):
 
     def set_window_size(self, width, height):
         self.screen = pygame.display.set_mode(size=(width, height), flags=pygame.RESIZABLE)
+        self.invalidate()
         ratio = min(width / GUISnakeGame.DEFAULT_WIDTH, height / GUISnakeGame.DEFAULT_HEIGHT)
-        self.title_font = pygame.font.Font('./Fonts/Mario-Kart-DS.ttf',
-                                           round(GUISnakeGame.DEFAULT_TITLE_FONT_SIZE * ratio))
-        self.normal_font = pygame.font.Font('./Fonts/Fipps-Regular.otf', round(GUISnakeGame.DEFAULT_FONT_SIZE * ratio))
+        self.title_font_size = round(GUISnakeGame.DEFAULT_TITLE_FONT_SIZE * ratio)
+        self.font_size = round(GUISnakeGame.DEFAULT_FONT_SIZE * ratio)
+        self.title_font = pygame.font.Font('./Fonts/Mario-Kart-DS.ttf', self.title_font_size)
+        self.normal_font = pygame.font.Font('./Fonts/Fipps-Regular.otf', self.font_size)
+        self.text_surfaces = {}
 
     def cleanup_pygame(self):
+        if self.planner is not None:
+            self.planner.cancel() # a search still running is left to the daemon thread
         pygame.font.quit()
         pygame.quit()
 
     def draw_cells(self, screen, gap, vertical_start, horizontal_start):
-        for i in range(self.rows):
-            for j in range(self.columns):
-                if self.grid[i][j] != EMPTY_CHAR:
-                    if self.grid[i][j] == WALL_CHAR:
-                        color = WHITE
-                    elif self.grid[i][j] == SNAKE_CHAR:
-                        color = YELLOW
-                    elif self.grid[i][j] == FOOD_CHAR:
-                        color = RED
-                    elif self.grid[i][j] == NEW_CHAR:
-                        color = GREEN
-                    elif self.grid[i][j] == S_CHAR:
-                        color = PURPLE
-                    elif self.grid[i][j] == CLOSED_CHAR:
-                        color = ORANGE
-                    pygame.draw.rect(screen, color, (horizontal_start + j * gap, vertical_start + i * gap, gap, gap))
+        for i, j, char in self.grid.occupied_cells():
+            if char != WALL_CHAR and (i, j) not in self.overlay: # the walls are on the background
+                pygame.draw.rect(screen, CELL_COLORS[char], self.cell_rect(i, j, gap, vertical_start, horizontal_start))
+        for (i, j), char in self.overlay.items():
+            pygame.draw.rect(screen, CELL_COLORS[char], self.cell_rect(i, j, gap, vertical_start, horizontal_start))
+
+    def cell_rect(self, i, j, gap, vertical_start, horizontal_start):
+        # Inside of the cell (i, j), without the grid lines around it
+        return pygame.Rect(horizontal_start + j * gap + 1, vertical_start + i * gap + 1, gap - 1, gap - 1)
+
+    def draw_dirty_cells(self, screen, gap, vertical_start, horizontal_start):
+        """
+            Draws the cells written since the last frame over the background.
+        :return: The rectangles drawn
+        """
+        rects = []
+        for i, j in self.dirty_cells:
+            if 0 <= i < self.rows and 0 <= j < self.columns:
+                rect = self.cell_rect(i, j, gap, vertical_start, horizontal_start)
+                screen.blit(self.background, rect, rect)
+                char = self.overlay.get((i, j)) or self.grid.get(i, j)
+                if char != EMPTY_CHAR:
+                    pygame.draw.rect(screen, CELL_COLORS[char], rect)
+                rects.append(rect)
+        self.dirty_cells.clear()
+        return rects
 
     def draw_grid(self, screen, gap, vertical_start, horizontal_start):
         for i in range(self.rows + 1):
@@ -370,28 +786,68 @@ class GUISnakeGame(SnakeGame):
             pygame.draw.line(screen, GREY, (horizontal_start + j * gap, vertical_start),
                              (horizontal_start + j * gap, vertical_start + self.rows * gap), 1)
 
+    def render_text(self, label, text, title=False):
+        """
+            Rendered text of a label of the menu. The surface of each label is kept and rendered again only when its
+            text or the font size changes.
+        :param label: The name of the label
+        :param text: The text to show
+        :param title: Use the title font instead of the normal font
+        :return: The surface of the text
+        """
+        key = (text, self.title_font_size if title else self.font_size)
+        cached = self.text_surfaces.get(label)
+        if cached is None or cached[0] != key:
+            font = self.title_font if title else self.normal_font
+            cached = (key, font.render(text, True, WHITE))
+            self.text_surfaces[label] = cached
+        return cached[1]
+
+    def draw_background(self, width, height):
+        gap, vertical_start, horizontal_start, menu_start = self.get_grid_base(width, height)
+        self.background = pygame.Surface((width, height))
+        self.background.fill(BLACK)
+        for i, j in self.walls:
+            pygame.draw.rect(self.background, CELL_COLORS[WALL_CHAR],
+                             self.cell_rect(i, j, gap, vertical_start, horizontal_start))
+        self.draw_grid(self.background, gap, vertical_start, horizontal_start)
+        pygame.draw.line(self.background, GREY, (menu_start, 0), (menu_start, height))
+
     def draw(self):
-        self.screen.fill(BLACK)
         width, height = self.screen.get_size()
         gap, vertical_start, horizontal_start, menu_start = self.get_grid_base(width, height)
-
-        # Draw the map
-        self.draw_cells(self.screen, gap, vertical_start, horizontal_start)
-        self.draw_grid(self.screen, gap, vertical_start, horizontal_start)
-        pygame.draw.line(self.screen, GREY, (menu_start, 0), (menu_start, height))
+        background_key = (width, height, self.rows, self.columns, self.walls)
+        if background_key != self.background_key:
+            self.draw_background(width, height)
+            self.background_key = background_key
+            self.full_redraw = True
+
+        # Draw the map: the whole screen when the snake is not moving (the grid can be edited), else only the cells
+        # that changed and the menu
+        menu = pygame.Rect(int(menu_start) + 1, 0, width - int(menu_start) - 1, height)
+        if self.full_redraw or not self.alive:
+            self.screen.blit(self.background, (0, 0))
+            self.draw_cells(self.screen, gap, vertical_start, horizontal_start)
+            self.dirty_cells.clear()
+            rects = None
+        else:
+            rects = self.draw_dirty_cells(self.screen, gap, vertical_start, horizontal_start)
+            self.screen.blit(self.background, menu, menu)
+            rects.append(menu)
+        self.full_redraw = False
 
         # Draw texts and timer
-        title = self.title_font.render(TITLE, True, WHITE)
-        score = self.normal_font.render('Score: ' + str(self.score), True, WHITE)
-        highscore = self.normal_font.render('Highscore: ' + str(self.best_score), True, WHITE)
-        size = self.normal_font.render('Size: ' + str(self.rows) + 'x' + str(self.columns), True, WHITE)
-        mps = self.normal_font.render('MPS: ' + str(self.mps), True, WHITE)
-        start = self.normal_font.render('Press Space', True, WHITE)
+        title = self.render_text('title', TITLE, title=True)
+        score = self.render_text('score', 'Score: ' + str(self.score))
+        highscore = self.render_text('highscore', 'Highscore: ' + str(self.best_score))
+        size = self.render_text('size', 'Size: ' + str(self.rows) + 'x' + str(self.columns))
+        mps = self.render_text('mps', 'MPS: ' + ('turbo' if self.turbo else str(self.mps)))
+        start = self.render_text('start', 'Press Space')
 
         if self.alive:
             self.current_time = time.time()
 
-        timer = self.normal_font.render('Timer: ' + str(round(self.current_time - self.start_time, 1)), True, WHITE)
+        timer = self.render_text('timer', 'Timer: ' + str(round(self.current_time - self.start_time, 1)))
         self.screen.blit(title, (
             menu_start + (width - menu_start) / 2 - title.get_width() / 2, height * (1 / 15) - title.get_height() / 2))
         self.screen.blit(score, (menu_start + (width - menu_start) / 7, height * (3 / 15) - score.get_height() / 2))
@@ -405,12 +861,15 @@ class GUISnakeGame(SnakeGame):
                 menu_start + (width - menu_start) / 2 - start.get_width() / 2, height / 2 - start.get_height() / 2))
 
         self.screen.blit(timer, (menu_start + (width - menu_start) / 7, height - timer.get_height()))
-        pygame.display.flip()
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
 
 
 class TrainingSnakeGame(SnakeGame):
-    def __init__(self, learning_agent):
-        super(TrainingSnakeGame, self).__init__()
+    def __init__(self, learning_agent, compact_grid=False, rows=20, columns=20, seed=None):
+        super(TrainingSnakeGame, self).__init__(compact_grid, rows, columns, seed)
         self.learning_agent = learning_agent
 
     def next_tick(self):
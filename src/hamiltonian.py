@@ -0,0 +1,189 @@
+### ---------- EXPLANATION ------------- ###
+# Hamiltonian cycle planner. A cycle going once
+# through every free cell of the grid is built once
+# per (rows, columns, walls) and cached; the next
+# move of the snake is then a simple lookup of the
+# cell of its head. Following the cycle gives the
+# perfect score.
+
+from gameModule import RIGHT, DOWN, LEFT, UP
+
+MOVES = [RIGHT, DOWN, LEFT, UP]
+SHORTCUT_MARGIN = 3
+
+_cycles = {}
+
+
+class HamiltonianCycle:
+    def __init__(self, rows, columns, order):
+        """
+        :param rows: The number of rows of the grid
+        :param columns: The number of columns of the grid
+        :param order: The (row, column) cells in the order of the cycle
+        """
+        self.rows = rows
+        self.columns = columns
+        self.length = len(order)
+        # index[i * columns + j] is the position of the cell (i, j) in the cycle, -1 if it is not on the cycle (wall)
+        self.index = [-1] * (rows * columns)
+        # move_indices[i * columns + j] is the index in MOVES of the move to do from the cell (i, j)
+        self.move_indices = [-1] * (rows * columns)
+        for k, cell in enumerate(order):
+            next_cell = order[(k + 1) % self.length]
+            self.index[cell[0] * columns + cell[1]] = k
+            self.move_indices[cell[0] * columns + cell[1]] = MOVES.index(
+                (next_cell[0] - cell[0], next_cell[1] - cell[1]))
+
+    def next_move(self, head):
+        return MOVES[self.move_indices[head[0] * self.columns + head[1]]]
+
+    def distance(self, start, end):
+        # Number of moves to go from start to end following the cycle
+        return (self.index[end[0] * self.columns + end[1]] - self.index[start[0] * self.columns + start[1]]) \
+            % self.length
+
+    def shortcut_move(self, grid, snake, food):
+        """
+            Next move with shortcuts: the snake may leave the cycle to jump towards the food, as long as it lands
+            on a cell that is still in front of its tail along the cycle (with a margin for its growth), and never
+            after the food. No shortcut is taken once the snake covers half of the cycle.
+        :param grid: The grid of the game
+        :param snake: The snake body, head first
+        :param food: The position of the food
+        :return: The move to do
+        """
+        head = snake[0]
+        move = self.next_move(head)
+        if food is None or 2 * len(snake) >= self.length:
+            return move
+
+        tail_distance = self.distance(head, snake[-1]) if len(snake) > 1 else self.length
+        food_distance = self.distance(head, food)
+        best_distance = 1
+        for candidate in MOVES:
+            cell = (head[0] + candidate[0], head[1] + candidate[1])
+            if not (0 <= cell[0] < self.rows and 0 <= cell[1] < self.columns) or grid.is_blocked(cell[0], cell[1]):
+                continue
+            if self.index[cell[0] * self.columns + cell[1]] == -1:
+                continue
+            distance = self.distance(head, cell)
+            if best_distance < distance <= food_distance and \
+                    distance < tail_distance - len(snake) - SHORTCUT_MARGIN:
+                best_distance = distance
+                move = candidate
+        return move
+
+
+def sshape_order(rows, columns):
+    """
+        S-shaped cycle (needs an even number of rows): the even rows are browsed to the left, the odd rows to the
+        right, without the last column which is used to go back up to the first row.
+    """
+    order = []
+    for i in range(rows):
+        if i % 2 == 0:
+            order.extend((i, j) for j in range(columns - 2, -1, -1))
+        else:
+            order.extend((i, j) for j in range(columns - 1))
+    order.extend((i, columns - 1) for i in range(rows - 1, -1, -1))
+    return order
+
+
+def spanning_tree_order(rows, columns, walls):
+    """
+        Cycle around a spanning tree of the 2x2 blocks of the grid (needs even rows and columns, and walls covering
+        whole 2x2 blocks). Every block is a small loop of 4 cells, and each edge of the tree merges the loops of the
+        two blocks it links.
+    :return: The cells in the order of the cycle, None if the layout is not supported
+    """
+    free_blocks = set()
+    for bi in range(rows // 2):
+        for bj in range(columns // 2):
+            cells = [(2 * bi, 2 * bj), (2 * bi, 2 * bj + 1), (2 * bi + 1, 2 * bj), (2 * bi + 1, 2 * bj + 1)]
+            n_walls = sum(cell in walls for cell in cells)
+            if n_walls == 0:
+                free_blocks.add((bi, bj))
+            elif n_walls != 4:
+                return None
+    if not free_blocks:
+        return None
+
+    links = {}
+
+    def link(a, b):
+        links.setdefault(a, set()).add(b)
+        links.setdefault(b, set()).add(a)
+
+    def unlink(a, b):
+        links[a].discard(b)
+        links[b].discard(a)
+
+    for bi, bj in free_blocks:
+        i, j = 2 * bi, 2 * bj
+        link((i, j), (i, j + 1))
+        link((i, j + 1), (i + 1, j + 1))
+        link((i + 1, j + 1), (i + 1, j))
+        link((i + 1, j), (i, j))
+
+    start = min(free_blocks)
+    visited = {start}
+    stack = [start]
+    while stack:
+        bi, bj = stack.pop()
+        for di, dj in MOVES:
+            block = (bi + di, bj + dj)
+            if block in free_blocks and block not in visited:
+                visited.add(block)
+                stack.append(block)
+                # merge the two loops through the sides facing each other
+                top, left = min(bi, block[0]), min(bj, block[1])
+                i, j = 2 * top, 2 * left
+                if di == 0:
+                    unlink((i, j + 1), (i + 1, j + 1))
+                    unlink((i, j + 2), (i + 1, j + 2))
+                    link((i, j + 1), (i, j + 2))
+                    link((i + 1, j + 1), (i + 1, j + 2))
+                else:
+                    unlink((i + 1, j), (i + 1, j + 1))
+                    unlink((i + 2, j), (i + 2, j + 1))
+                    link((i + 1, j), (i + 2, j))
+                    link((i + 1, j + 1), (i + 2, j + 1))
+    if len(visited) != len(free_blocks):
+        return None
+
+    first = (2 * start[0], 2 * start[1])
+    order = [first]
+    previous, current = first, min(links[first])
+    while current != first:
+        order.append(current)
+        previous, current = current, next(cell for cell in links[current] if cell != previous)
+    return order
+
+
+def build_cycle(rows, columns, walls):
+    if not walls:
+        if rows % 2 == 0 and columns >= 2:
+            return HamiltonianCycle(rows, columns, sshape_order(rows, columns))
+        if columns % 2 == 0 and rows >= 2:
+            return HamiltonianCycle(rows, columns, [(i, j) for j, i in sshape_order(columns, rows)])
+        return None
+    if rows % 2 or columns % 2:
+        return None
+    order = spanning_tree_order(rows, columns, walls)
+    if order is None:
+        return None
+    return HamiltonianCycle(rows, columns, order)
+
+
+def get_cycle(rows, columns, walls=frozenset()):
+    """
+        Hamiltonian cycle of the grid, built on the first call for a given layout and cached.
+    :param rows: The number of rows of the grid
+    :param columns: The number of columns of the grid
+    :param walls: frozenset of the (row, column) positions of the walls
+    :return: The HamiltonianCycle, None if no cycle could be built for this layout
+    """
+    key = (rows, columns, walls)
+    if key not in _cycles:
+        _cycles[key] = build_cycle(rows, columns, walls)
+    return _cycles[key]
@@ -1,61 +1,24 @@
-### ---------------- DISCLAIMER ----------------- ###
-# Make sure to have more than 4 logical cores before
-# running  this code, otherwise (if 4 only), comment 
-# the lines marked with "#*****", and edit lines
-# marked with "#-----".
-
 ### ---------------- EXPLANATIONS --------------- ###
-# This file simply launches the snakeAI.py in training
-# mode with different flags, and writes the results
-# in files with adequate names, and this is done in 
-# parallel with the multiprocessing package.
-
-import multiprocessing
-import os
-
-
-def runMP(core_name, core_id):
-    file_path = './survival/' # Make sure to first create this directory
-    if core_id == 1:
-        command = 'python ./src/snakeAI.py -t -s -o '
-        filename_base = file_path+'sshaped_'
-
-    elif core_id == 2:
-        command = 'python ./src/snakeAI.py -t -a -o '
-        filename_base = file_path+'astar_'
-
-    elif core_id == 3:
-        command = 'python ./src/snakeAI.py -t -w -o '
-        filename_base = file_path+'weighted_'
-
-    elif core_id == 4:
-        command = 'python ./src/snakeAI.py -t -n -o '
-        filename_base = file_path+'inverse_'
-
-    elif core_id == 5: #*****
-        command = 'python ./src/snakeAI.py -t -r -o ' #*****
-        filename_base = file_path+'random_' #*****
-
-
-    else:
-        print('Wrong Core ID. Aborting')
-        return -1
-
-    # Each algorithm is ran 30 times
-    for count in range(30): 
-        filename = filename_base+str(count)+'.csv'
-        print(core_name+'running on '+filename+', count: '+str(count))
-        os.system(command+filename)
+# This file launches the training games of the
+# report: every algorithm is played 30 times and
+# the results are written in one .npz file (see
+# results.py). The games are spread over a pool of
+# processes with as many workers as logical cores
+# (see experiments.py), edit the constants below
+# to change the experiment.
+
+from experiments import experiment_matrix, run_experiments
+
+OUTPUT = './survival/results.npz'
+ALGORITHMS = ['sshaped', 'astar', 'weighted', 'inverse', 'random']
+SURVIVAL = [False]
+SIZES = [(20, 20)]
+SEEDS = range(30) # Each algorithm is ran 30 times
+PROFILE = False # Record the latency of every move of the planners (see profiling.py)
+REPLAYS = None # e.g. './survival/replays': directory where the replay of every game is written (see replay.py)
+CI_WIDTH = None # e.g. 2: stop an algorithm once its mean score is known within +-2 (95% confidence)
 
 
 if __name__ == '__main__':
-
-    processes = []
-    for i in range(1, 6): #-----: change "6" in "5" if only 4 cores
-        p = multiprocessing.Process(target=runMP, args=("Core-%i"%i, i, ))
-        processes.append(p)
-        p.start()
-
-    for process in processes:
-        process.join()
-
+    run_experiments(experiment_matrix(ALGORITHMS, SURVIVAL, SIZES, SEEDS), OUTPUT, ci_width=CI_WIDTH, profile=PROFILE,
+                    replay_dir=REPLAYS)
@@ -0,0 +1,83 @@
+### ---------- EXPLANATION ------------- ###
+# Instrumentation of the planners. A Profiler
+# records the latency of each call of the timed
+# methods of an agent in a histogram with one
+# bucket per power of two of nanoseconds, and a
+# few search counters (nodes expanded, peak size
+# of the open list, replans). The agents are only
+# instrumented when a Profiler is given to them
+# (see Agent.instrument), so there is no cost
+# otherwise.
+
+import time
+
+TIMERS = ('choose_next_move', 'astar', 'survival_mode')
+COUNTERS = ('nodes expanded', 'open list peak', 'replans', 'survival replans')
+N_BUCKETS = 40 # Bucket k holds the calls that took between 2^(k-1) and 2^k nanoseconds (the last one holds the rest)
+
+
+class Profiler:
+    def __init__(self):
+        self.histograms = {name: [0] * N_BUCKETS for name in TIMERS}
+        self.totals = dict.fromkeys(TIMERS, 0) # Total time of each timer, in nanoseconds
+        self.maxima = dict.fromkeys(TIMERS, 0) # Longest call of each timer, in nanoseconds
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def timed(self, name, function):
+        """
+            Wraps the function so that the latency of each of its calls is recorded under the given timer name.
+        """
+        histogram = self.histograms[name]
+        perf_counter_ns = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            result = function(*args, **kwargs)
+            latency = perf_counter_ns() - start
+            histogram[min(latency.bit_length(), N_BUCKETS - 1)] += 1
+            self.totals[name] += latency
+            if latency > self.maxima[name]:
+                self.maxima[name] = latency
+            return result
+        return wrapper
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def peak(self, name, value):
+        if value > self.counters[name]:
+            self.counters[name] = value
+
+    def calls(self, name):
+        return sum(self.histograms[name])
+
+    def percentile(self, name, q):
+        """
+            Approximate percentile of the latency of a timer, from its histogram.
+        :param q: The percentile, between 0 and 100
+        :return: The upper bound of the bucket holding the percentile (at most the longest call), in microseconds
+                 (None if there was no call)
+        """
+        histogram = self.histograms[name]
+        calls = sum(histogram)
+        if not calls:
+            return None
+        seen = 0
+        for bucket, n in enumerate(histogram):
+            seen += n
+            if seen * 100 >= q * calls:
+                return min(1 << bucket, self.maxima[name]) / 1000
+
+    def summary(self):
+        """
+        :return: Dictionary giving, for each timer called at least once, its number of calls, mean, 99th percentile
+                 and max latencies (in microseconds), and the counters
+        """
+        summary = {}
+        for name in TIMERS:
+            calls = self.calls(name)
+            if calls:
+                summary[name] = {'calls': calls, 'mean us': self.totals[name] / calls / 1000,
+                                 'p99 us': self.percentile(name, 99), 'max us': self.maxima[name] / 1000}
+        summary.update(self.counters)
+        return summary
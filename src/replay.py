@@ -0,0 +1,202 @@
+### ---------- EXPLANATION ------------- ###
+# Compact replays of the games. A Replay keeps
+# what is needed to play a run again without the
+# agent: the board, its walls, the state of the
+# random generator of the game at the start of the
+# run and one 2-bit code per move. The Replayer
+# rebuilds the state of the game at any tick by
+# playing the moves forward from the closest
+# snapshot, the snapshots being taken every
+# SNAPSHOT_INTERVAL ticks on the way.
+#
+# python replay.py replay.npz --tick 100
+
+from gameModule import SnakeGame, FreeCells, RIGHT, DOWN, LEFT, UP, EMPTY_CHAR, SNAKE_CHAR, WALL_CHAR, FOOD_CHAR
+from collections import deque
+import argparse
+import bisect
+import numpy as np
+
+MOVES = [RIGHT, DOWN, LEFT, UP] # The move of code k is MOVES[k]
+MOVE_CODES = {RIGHT: 0, DOWN: 1, LEFT: 2, UP: 3}
+SNAPSHOT_INTERVAL = 256
+
+
+class Replay:
+    """
+        Record of one run of a SnakeGame (see SnakeGame.record_replay). The walls must not change during the run.
+    """
+    def __init__(self, rows, columns, compact_grid, seed, walls, free_cells, rng_state, moves=b'', n_moves=0):
+        """
+        :param walls: The (row, column) positions of the walls
+        :param free_cells: The free cells of the game before the snake is spawned, in the order of its FreeCells
+        :param rng_state: The state of the random generator of the game before the snake is spawned
+        :param moves: The move codes, packed 4 per byte (the first move in the lowest bits)
+        :param n_moves: The number of moves
+        """
+        self.rows = rows
+        self.columns = columns
+        self.compact_grid = compact_grid
+        self.seed = seed
+        self.walls = frozenset(walls)
+        self.free_cells = list(free_cells)
+        self.rng_state = rng_state
+        self.moves = bytearray(moves)
+        self.n_moves = n_moves
+
+    @classmethod
+    def from_game(cls, game):
+        """
+            Replay of the run the game is starting: called by SnakeGame.start_run, before the snake is spawned.
+        """
+        return cls(game.rows, game.columns, game.compact_grid, game.seed, game.walls, game.free_cells,
+                   game.rng.getstate())
+
+    def __len__(self):
+        return self.n_moves
+
+    def add_move(self, move):
+        if self.n_moves % 4 == 0:
+            self.moves.append(0)
+        self.moves[-1] |= MOVE_CODES[move] << (2 * (self.n_moves % 4))
+        self.n_moves += 1
+
+    def get_move(self, k):
+        return MOVES[(self.moves[k >> 2] >> (2 * (k & 3))) & 3]
+
+    def save(self, path):
+        version, state, gauss = self.rng_state
+        np.savez_compressed(
+            path,
+            size=np.array([self.rows, self.columns, self.compact_grid, -1 if self.seed is None else self.seed],
+                          dtype=np.int64),
+            walls=np.array([i * self.columns + j for i, j in sorted(self.walls)], dtype=np.int32),
+            free_cells=np.array([i * self.columns + j for i, j in self.free_cells], dtype=np.int32),
+            rng_state=np.array(state, dtype=np.uint32),
+            moves=np.frombuffer(bytes(self.moves), dtype=np.uint8),
+            n_moves=np.array(self.n_moves, dtype=np.int64))
+
+
+def load_replay(path):
+    with np.load(path) as data:
+        rows, columns, compact_grid, seed = (int(value) for value in data['size'])
+        return Replay(rows, columns, bool(compact_grid), None if seed == -1 else seed,
+                      [divmod(int(cell), columns) for cell in data['walls']],
+                      [divmod(int(cell), columns) for cell in data['free_cells']],
+                      (3, tuple(int(value) for value in data['rng_state']), None),
+                      data['moves'].tobytes(), int(data['n_moves']))
+
+
+class Snapshot:
+    """
+        State of a SnakeGame after a given number of ticks, with the order of its free cells and the state of its
+        random generator so that the food spawns the same way after a restore.
+    """
+    __slots__ = ('tick', 'snake', 'food', 'score', 'alive', 'previous_move', 'free_cells', 'rng_state')
+
+    def __init__(self, tick, game):
+        self.tick = tick
+        self.snake = tuple(game.snake)
+        self.food = game.food
+        self.score = game.score
+        self.alive = game.alive
+        self.previous_move = game.previous_move
+        self.free_cells = list(game.free_cells)
+        self.rng_state = game.rng.getstate()
+
+
+class Replayer:
+    """
+        Headless replay of a Replay: state_at gives the state of the game after any number of moves, without the
+        agent.
+    """
+    def __init__(self, replay, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.replay = replay
+        self.snapshot_interval = snapshot_interval
+        self.game = SnakeGame(replay.compact_grid, replay.rows, replay.columns)
+        self.tick = 0
+        self.start()
+        self.snapshots = [Snapshot(0, self.game)]
+
+    def set_board(self, free_cells):
+        # Empty board with the walls of the replay and the given order of the free cells
+        game = self.game
+        game.init_grid()
+        for i, j in self.replay.walls:
+            game.grid.set(i, j, WALL_CHAR)
+        game.walls = self.replay.walls
+        game.free_cells = FreeCells(free_cells)
+
+    def start(self):
+        # Same as SnakeGame.start_run, from the state recorded in the replay
+        game = self.game
+        self.set_board(self.replay.free_cells)
+        game.rng.setstate(self.replay.rng_state)
+        game.snake = deque()
+        game.food = None
+        game.alive = True
+        game.score = 0
+        game.previous_move = None
+        game.next_move = None
+        game.spawn_snake()
+        game.spawn_food()
+
+    def restore(self, snapshot):
+        game = self.game
+        self.set_board(snapshot.free_cells)
+        for i, j in snapshot.snake:
+            game.grid.set(i, j, SNAKE_CHAR)
+        if snapshot.food is not None:
+            game.grid.set(snapshot.food[0], snapshot.food[1], FOOD_CHAR)
+        game.snake = deque(snapshot.snake)
+        game.food = snapshot.food
+        game.score = snapshot.score
+        game.alive = snapshot.alive
+        game.previous_move = snapshot.previous_move
+        game.next_move = None
+        game.rng.setstate(snapshot.rng_state)
+        self.tick = snapshot.tick
+
+    def state_at(self, tick):
+        """
+            State of the game after the given number of moves.
+        :param tick: Between 0 and len(replay)
+        :return: The state, as given by SnakeGame.get_state (the grid and the snake are the ones of the replayer and
+                 change with the next call)
+        """
+        if not 0 <= tick <= len(self.replay):
+            raise ValueError("Tick %i out of the replay (%i moves)." % (tick, len(self.replay)))
+        ticks = [snapshot.tick for snapshot in self.snapshots]
+        snapshot = self.snapshots[bisect.bisect_right(ticks, tick) - 1]
+        if not snapshot.tick <= self.tick <= tick:
+            self.restore(snapshot)
+
+        game = self.game
+        while self.tick < tick:
+            game.set_next_move(self.replay.get_move(self.tick))
+            game.move_snake()
+            self.tick += 1
+            if self.tick == len(self.snapshots) * self.snapshot_interval:
+                self.snapshots.append(Snapshot(self.tick, game))
+        return game.get_state()
+
+
+def show(state):
+    # Text drawing of the grid, the empty cells are dots
+    grid, score, alive, snake = state
+    return '\n'.join(''.join(grid.get(i, j).replace(EMPTY_CHAR, '.') for j in range(grid.columns))
+                     for i in range(grid.rows))
+
+
+parser = argparse.ArgumentParser(description="Shows the state of a recorded game at a given tick.")
+parser.add_argument("replay", type=str, help="the replay file (.npz)")
+parser.add_argument("--tick", type=int, help="the number of moves played, the end of the game if not given")
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    replay = load_replay(args.replay)
+    tick = len(replay) if args.tick is None else args.tick
+    state = Replayer(replay).state_at(tick)
+    print(show(state))
+    print('Tick %i/%i, score %i, %s' % (tick, len(replay), state[1], 'alive' if state[2] else 'dead'))
@@ -0,0 +1,272 @@
+### ---------- EXPLANATION ------------- ###
+# Results of the training games. A run only keeps
+# the moves at which the score changed, and the
+# runs of an experiment are buffered in memory and
+# written at once in a single compressed .npz file
+# (one column per field, all runs concatenated).
+# Running statistics of each configuration are
+# kept up to date as the runs come in, so that a
+# summary is available at any time.
+
+import math
+import numpy as np
+from profiling import TIMERS, COUNTERS, N_BUCKETS
+
+Z_95 = 1.96 # Quantile of the normal distribution for the 95% confidence intervals
+
+
+class Run:
+    """
+        Result of one training game: the score changes, the total number of moves and the time taken.
+    """
+    __slots__ = ('name', 'seed', 'counts', 'scores', 'total_moves', 'time_taken', 'profiler')
+
+    def __init__(self, name, seed, counts, scores, total_moves, time_taken, profiler=None):
+        """
+        :param name: The name of the configuration (see experiments.run_name)
+        :param seed: The seed of the game
+        :param counts: The moves at which the score changed, starting with 0
+        :param scores: The score reached at each of these moves, starting with 0
+        :param total_moves: The number of moves played
+        :param time_taken: The time taken by the game, in seconds
+        :param profiler: The profiling.Profiler of the agent, None if it was not instrumented
+        """
+        self.name = name
+        self.seed = seed
+        self.counts = counts
+        self.scores = scores
+        self.total_moves = total_moves
+        self.time_taken = time_taken
+        self.profiler = profiler
+
+    @property
+    def final_score(self):
+        return self.scores[-1]
+
+
+class RunningStatistics:
+    """
+        Mean and variance of a stream of values (Welford's algorithm), without keeping the values.
+    """
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of the squared differences to the mean
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        # Population variance, like np.var
+        return self.m2 / self.n if self.n else math.nan
+
+    def confidence_interval(self):
+        # Half width of the 95% confidence interval of the mean, inf until there are 2 values
+        if self.n < 2:
+            return math.inf
+        return Z_95 * math.sqrt(self.m2 / (self.n - 1) / self.n)
+
+
+class Aggregate:
+    """
+        Statistics of the runs of one configuration, updated run by run:
+            scores, moves, times: RunningStatistics of the final score, of the number of moves and of the time per
+                                  move (in microseconds)
+            score_sums, playing: sum of the scores at each move over the runs, and number of runs still playing
+    """
+    def __init__(self):
+        self.scores = RunningStatistics()
+        self.moves = RunningStatistics()
+        self.times = RunningStatistics()
+        self.score_sums = np.zeros(0)
+        self.playing = np.zeros(0, dtype=np.int64)
+
+    def add(self, run):
+        self.scores.add(run.final_score)
+        self.moves.add(run.total_moves)
+        if run.total_moves:
+            self.times.add(run.time_taken / run.total_moves * 1000000)
+
+        if run.total_moves > len(self.score_sums):
+            self.score_sums = np.concatenate((self.score_sums, np.zeros(run.total_moves - len(self.score_sums))))
+            self.playing = np.concatenate((self.playing, np.zeros(run.total_moves - len(self.playing), np.int64)))
+        lengths = np.diff(run.counts, append=run.total_moves)
+        self.score_sums[:run.total_moves] += np.repeat(run.scores, lengths)
+        self.playing[:run.total_moves] += 1
+
+    def mean_curve(self):
+        # Mean score at each move, over the runs still playing at that move (same as Results.mean_curve)
+        return self.score_sums / self.playing
+
+    def summary(self):
+        return {'runs': self.scores.n,
+                'moves mean': self.moves.mean, 'score mean': self.scores.mean,
+                'moves var': self.moves.variance, 'score var': self.scores.variance,
+                'score ci': self.scores.confidence_interval(), 'time per move': self.times.mean}
+
+
+class ResultsSink:
+    """
+        Buffers the runs of an experiment and writes them in one .npz file when closed. The file holds:
+            names, seeds, total_moves, final_scores, times: one value per run
+            offsets: the rows of run k are counts[offsets[k]:offsets[k + 1]] and scores[offsets[k]:offsets[k + 1]]
+            counts, scores: the score changes of all the runs, concatenated
+        If at least one run was profiled, the file also holds (zeros for the other runs):
+            latency_histograms: (runs, TIMERS, N_BUCKETS) latency histograms (see profiling.Profiler)
+            latency_totals, latency_maxima: (runs, TIMERS) total and longest latencies, in nanoseconds
+            counters: (runs, COUNTERS) search counters
+        The Aggregate of each configuration name is updated as the runs are added.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.runs = []
+        self.aggregates = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, run):
+        self.runs.append(run)
+        if run.name not in self.aggregates:
+            self.aggregates[run.name] = Aggregate()
+        self.aggregates[run.name].add(run)
+
+    def summary(self):
+        """
+        :return: Dictionary giving the statistics of each configuration name for the runs added so far
+                 (see Aggregate.summary)
+        """
+        return {name: aggregate.summary() for name, aggregate in self.aggregates.items()}
+
+    def close(self):
+        runs = self.runs
+        lengths = [len(run.counts) for run in runs]
+        profile = {}
+        if any(run.profiler is not None for run in runs):
+            profile = {'latency_histograms': np.zeros((len(runs), len(TIMERS), N_BUCKETS), dtype=np.int64),
+                       'latency_totals': np.zeros((len(runs), len(TIMERS)), dtype=np.int64),
+                       'latency_maxima': np.zeros((len(runs), len(TIMERS)), dtype=np.int64),
+                       'counters': np.zeros((len(runs), len(COUNTERS)), dtype=np.int64)}
+            for k, run in enumerate(runs):
+                if run.profiler is not None:
+                    profile['latency_histograms'][k] = [run.profiler.histograms[name] for name in TIMERS]
+                    profile['latency_totals'][k] = [run.profiler.totals[name] for name in TIMERS]
+                    profile['latency_maxima'][k] = [run.profiler.maxima[name] for name in TIMERS]
+                    profile['counters'][k] = [run.profiler.counters[name] for name in COUNTERS]
+        np.savez_compressed(
+            self.path,
+            names=np.array([run.name for run in runs], dtype=str),
+            seeds=np.array([-1 if run.seed is None else run.seed for run in runs], dtype=np.int64),
+            total_moves=np.array([run.total_moves for run in runs], dtype=np.int64),
+            final_scores=np.array([run.final_score for run in runs], dtype=np.int64),
+            times=np.array([run.time_taken for run in runs], dtype=np.float64),
+            offsets=np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+            counts=np.array([count for run in runs for count in run.counts], dtype=np.int32),
+            scores=np.array([score for run in runs for score in run.scores], dtype=np.int32),
+            **profile)
+
+
+class Results:
+    """
+        All the runs of one configuration, as arrays:
+            curves: (runs, max moves) array of the score at each move of each run, padded with NaN after the end
+            total_moves, final_scores, times, seeds: one value per run
+            latency_histograms, counters: the profiling columns of the runs (see ResultsSink), None if the runs
+                                          were not profiled
+    """
+    __slots__ = ('curves', 'total_moves', 'final_scores', 'times', 'seeds', 'latency_histograms', 'counters')
+
+    def __init__(self, curves, total_moves, final_scores, times, seeds, latency_histograms=None, counters=None):
+        self.curves = curves
+        self.total_moves = total_moves
+        self.final_scores = final_scores
+        self.times = times
+        self.seeds = seeds
+        self.latency_histograms = latency_histograms
+        self.counters = counters
+
+    def mean_curve(self):
+        # Mean score at each move, over the runs still playing at that move
+        return np.nanmean(self.curves, axis=0)
+
+    def end_statistics(self):
+        return {'moves mean': np.mean(self.total_moves), 'score mean': np.mean(self.final_scores),
+                'moves var': np.var(self.total_moves), 'score var': np.var(self.final_scores)}
+
+    def mean_time_per_move(self):
+        # In microseconds
+        return np.mean(self.times / self.total_moves) * 1000000
+
+    def latency_histogram(self, timer):
+        """
+            Latency histogram of a timer (see profiling.TIMERS) summed over the runs: bucket k holds the calls that
+            took between 2^(k-1) and 2^k nanoseconds.
+        """
+        return self.latency_histograms[:, TIMERS.index(timer)].sum(axis=0)
+
+    def counter(self, name):
+        # Value of a counter (see profiling.COUNTERS) for each run
+        return self.counters[:, COUNTERS.index(name)]
+
+
+def score_curves(counts, scores, starts, ends, total_moves):
+    """
+        Expands the score changes of several runs into one padded (runs, max moves) array of the score at each move.
+        The score changes of run k are counts[starts[k]:ends[k]] and scores[starts[k]:ends[k]].
+    """
+    curves = np.full((len(total_moves), max(total_moves, default=0)), np.nan)
+    for k in range(len(total_moves)):
+        lengths = np.diff(counts[starts[k]:ends[k]], append=total_moves[k])
+        curves[k, :total_moves[k]] = np.repeat(scores[starts[k]:ends[k]], lengths)
+    return curves
+
+
+def load_results(path):
+    """
+        Loads an .npz file written by ResultsSink.
+    :return: Dictionary giving the Results of each configuration name
+    """
+    with np.load(path) as data:
+        data = dict(data) # decompress every column once
+    names = data['names']
+    offsets = data['offsets']
+    results = {}
+    for name in dict.fromkeys(names):
+        runs = np.flatnonzero(names == name)
+        total_moves = data['total_moves'][runs]
+        curves = score_curves(data['counts'], data['scores'], offsets[runs], offsets[runs + 1], total_moves)
+        results[name] = Results(curves, total_moves, data['final_scores'][runs], data['times'][runs],
+                                data['seeds'][runs])
+        if 'counters' in data:
+            results[name].latency_histograms = data['latency_histograms'][runs]
+            results[name].counters = data['counters'][runs]
+    return results
+
+
+def load_csv_results(file_path, names, n_samples):
+    """
+        Loads the csv files of the previous format (one file per run named name_i.csv, one line per move and a last
+        line with the number of moves and the time taken).
+    :return: Dictionary giving the Results of each name
+    """
+    results = {}
+    for name in names:
+        tables = [np.loadtxt(file_path + name + '_' + str(i) + '.csv', delimiter=',', skiprows=1, ndmin=2)
+                  for i in range(n_samples)]
+        total_moves = np.array([int(table[-1, 0]) for table in tables])
+        curves = np.full((n_samples, max(total_moves)), np.nan)
+        for i, table in enumerate(tables):
+            curves[i, :len(table) - 1] = table[:-1, 1]
+        final_scores = np.array([table[-2, 1] if len(table) > 1 else 0 for table in tables])
+        times = np.array([table[-1, 1] for table in tables])
+        results[name] = Results(curves, total_moves, final_scores, times, np.arange(n_samples))
+    return results
@@ -0,0 +1,26 @@
+### ---------- EXPLANATION ------------- ###
+# Checks that the headless modules (training,
+# batch games, replays) can be imported without
+# importing pygame (see gameModule.load_pygame).
+# Runs with pytest or as a script:
+#
+# python tests/test_headless_import.py
+
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+HEADLESS_MODULES = ['experiments', 'agents', 'batchGame', 'replay']
+
+
+def test_headless_modules_do_not_import_pygame():
+    # A new interpreter, so that the modules already imported by the test runner do not matter
+    code = 'import sys\nimport %s\nassert "pygame" not in sys.modules, "pygame was imported"' \
+           % ', '.join(HEADLESS_MODULES)
+    subprocess.run([sys.executable, '-c', code], cwd=SRC, check=True)
+
+
+if __name__ == '__main__':
+    test_headless_modules_do_not_import_pygame()
+    print('ok')